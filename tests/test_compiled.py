@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from text_classifier.benchmarks.corpus import CorpusGenerator
+from text_classifier.compiled import CompiledModel, compare_with_sklearn
+from text_classifier.models import LightweightClassifier
+
+
+class CompiledModelTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.texts, cls.labels = CorpusGenerator(seed=1).dataset(600)
+        # 对比用另一份语料，包含训练时没见过的词组合
+        cls.check_texts, _ = CorpusGenerator(seed=2).dataset(300)
+
+    def assert_matches_sklearn(self, incremental):
+        classifier = LightweightClassifier(incremental=incremental)
+        classifier.train(self.texts, self.labels)
+        compiled = CompiledModel.from_classifier(classifier)
+
+        report = compare_with_sklearn(classifier, compiled, self.check_texts)
+        self.assertEqual(report['category_mismatches'], 0)
+        self.assertEqual(report['sub_head_mismatches'], 0)
+        self.assertLess(report['max_proba_error'], 1e-5)
+
+        # 保存再加载后结果不变
+        with tempfile.TemporaryDirectory(prefix='classifier-test-') as tmp_dir:
+            compiled.save(tmp_dir)
+            loaded = CompiledModel.load(tmp_dir)
+        tokens = classifier.tokenize_many(self.check_texts)
+        np.testing.assert_array_equal(
+            compiled.scores(compiled.features(tokens))[0],
+            loaded.scores(loaded.features(tokens))[0]
+        )
+
+    def test_tfidf_matches_sklearn(self):
+        self.assert_matches_sklearn(incremental=False)
+
+    def test_hashing_matches_sklearn(self):
+        self.assert_matches_sklearn(incremental=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from text_classifier.data_processor import DataProcessor
+
+
+def legacy_preprocess(text):
+    """改用预编译正则之前的逐字符实现"""
+    text = ''.join([char for char in text if '\u4e00' <= char <= '\u9fff' or char.isspace()])
+    return ' '.join(text.split())
+
+
+class PreprocessTest(unittest.TestCase):
+    def test_preprocess_many_matches_preprocess_text(self):
+        processor = DataProcessor()
+        texts = [
+            '',
+            '   ',
+            '我们要诚信友善，爱国敬业！',
+            '  多余   的\t空白\n和换行  ',
+            'Hello, World! 123 abc_def',
+            '表情😀和符号@#￥%……&*（）【】',
+            '全角ＡＢＣ１２３和半角ABC123',
+            '“引号”『书名号』《标题》',
+            '全角\u3000空格和\x1c控制\u00a0空白',
+            '扩展汉字\u3400\U00020000兼容\uf900',
+        ]
+        expected = [legacy_preprocess(text) for text in texts]
+        self.assertEqual([processor.preprocess_text(text) for text in texts], expected)
+        self.assertEqual(processor.preprocess_many(texts), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from text_classifier.benchmarks.corpus import CorpusGenerator
+from text_classifier.jobs import RetrainJobManager
+from text_classifier.model_registry import ModelRegistry
+
+
+class RetrainJobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix='classifier-test-')
+        self.registry = ModelRegistry(self.tmp_dir.name)
+        self.ready = []
+        self.manager = RetrainJobManager(self.registry, self.ready.append)
+        self.texts, self.labels = CorpusGenerator(seed=1).dataset(300)
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.tmp_dir.cleanup()
+
+    async def _retrain(self):
+        job = self.manager.create()
+        self.manager.start(job, self.texts, self.labels)
+        await asyncio.gather(*self.manager._tasks)
+        return job
+
+    def test_retrain_after_training_process_died(self):
+        async def scenario():
+            # 让训练进程直接退出，模拟 OOM / 段错误，进程池随之损坏
+            executor = self.manager._get_executor()
+            with self.assertRaises(Exception):
+                await asyncio.wrap_future(executor.submit(os._exit, 1))
+
+            failed = await self._retrain()
+            self.assertEqual(failed.status, 'failed')
+            self.assertIsNone(self.manager._executor)
+
+            succeeded = await self._retrain()
+            self.assertEqual(succeeded.status, 'succeeded', succeeded.error)
+            self.assertEqual(self.registry.current_version(), succeeded.model_version)
+            self.assertEqual(len(self.ready), 1)
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from text_classifier.benchmarks.corpus import CorpusGenerator
+from text_classifier.model_artifact import is_artifact
+from text_classifier.models import LightweightClassifier
+
+
+class ModelArtifactTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.texts, cls.labels = CorpusGenerator(seed=1).dataset(600)
+        cls.new_texts, cls.new_labels = CorpusGenerator(seed=3).dataset(200)
+        cls.check_texts, _ = CorpusGenerator(seed=2).dataset(200)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix='classifier-test-')
+        self.path = os.path.join(self.tmp_dir.name, 'classifier')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def round_trip(self, classifier):
+        classifier.save(self.path)
+        self.assertTrue(is_artifact(self.path))
+        loaded = LightweightClassifier()
+        loaded.load(self.path, allow_pickle=False)
+        return loaded
+
+    def assert_same_predictions(self, expected, actual):
+        for a, b in zip(expected.predict_many(self.check_texts), actual.predict_many(self.check_texts)):
+            self.assertEqual(a['category'], b['category'])
+            self.assertEqual(a['sub_categories'], b['sub_categories'])
+            self.assertAlmostEqual(a['confidence'], b['confidence'], places=6)
+
+    def test_tfidf_round_trip(self):
+        classifier = LightweightClassifier()
+        classifier.train(self.texts, self.labels)
+        self.assert_same_predictions(classifier, self.round_trip(classifier))
+
+    def test_partial_fit_after_load(self):
+        classifier = LightweightClassifier(incremental=True)
+        classifier.train(self.texts, self.labels)
+        loaded = self.round_trip(classifier)
+        self.assertTrue(loaded.incremental)
+        self.assert_same_predictions(classifier, loaded)
+
+        # 加载后的模型与原模型增量更新的结果相同
+        classifier.partial_fit(self.new_texts, self.new_labels)
+        self.assertIsNotNone(loaded.partial_fit(self.new_texts, self.new_labels))
+        np.testing.assert_allclose(
+            classifier.pipeline[-1].coef_, loaded.pipeline[-1].coef_, rtol=1e-6, atol=1e-9
+        )
+        self.assert_same_predictions(classifier, loaded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+
+from text_classifier.model_registry import ModelRegistry
+
+
+class RemoveOldVersionsTest(unittest.TestCase):
+    def test_keeps_current_and_latest_versions(self):
+        with tempfile.TemporaryDirectory(prefix='classifier-test-') as model_dir:
+            registry = ModelRegistry(model_dir)
+            versions = [f'20260101000{i}00-abcdef' for i in range(6)]
+            for version in versions:
+                os.makedirs(registry.path_for(version))
+            os.makedirs(registry.default_artifact_path)
+            # 线上版本回滚到了较旧的版本
+            registry.promote(versions[1])
+
+            removed = registry.remove_old_versions(keep=2)
+
+            self.assertEqual(removed, [versions[0], versions[2], versions[3]])
+            self.assertEqual(registry.versions(), [versions[1], versions[4], versions[5]])
+            self.assertTrue(os.path.isdir(registry.default_artifact_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,56 @@
+import time
+
+# 模块导入耗时，启动后通过 /ready 返回
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
-from .models import LightweightClassifier
+from pydantic import BaseModel, Field
 from .data_processor import DataProcessor
-import sqlite3
+from .workers import WorkerPool, WorkerBusyError
+from .model_registry import ModelRegistry
+from .jobs import RetrainJobManager
+from .database import DatabaseManager
+from .cache import PredictionCache
+from . import bulk_io
+from . import startup
+from . import metrics
+from .log import configure_logging
+from .llm import SuggestionService, create_backend
+from .dedup import NearDuplicateIndex, dedupe
+import asyncio
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime
 import json
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from openai import OpenAI
-from typing import Optional
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, PlainTextResponse
+from typing import Optional, List, Literal
+
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # 模型、词典和数据库在启动阶段加载一次，完成前 uvicorn 不会接收请求
+    global llm_service
+    configure_logging()
+    await asyncio.to_thread(initialize)
+    backend = create_backend(LLM_WORKERS)
+    # 未配置大模型时 /ai-suggestion 返回 503
+    llm_service = SuggestionService(backend, LLM_WORKERS, LLM_MAX_QUEUE) if backend is not None else None
+    startup_state.status = 'ready'
+    yield
+    startup_state.status = 'stopping'
+    inference_pool.shutdown(wait=False)
+    if llm_service is not None:
+        await llm_service.close()
+    retrain_jobs.shutdown()
+    db.close()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 # 添加静态文件服务
 app.mount("/static", StaticFiles(directory="text_classifier/static"), name="static")
@@ -22,51 +61,237 @@ templates = Jinja2Templates(directory="text_classifier/templates")
 class TextRequest(BaseModel):
     text: str
 
+class BatchTextRequest(BaseModel):
+    texts: List[str]
+
+# 单次批量分类的最大文本数
+MAX_BATCH_SIZE = 5000
+
 class TrainingConfig(BaseModel):
+    # 增量模式完整训练时 partial_fit 遍历的轮数
     epochs: int = 10
+    # batch_size 和 learning_rate 目前的模型（逻辑回归 / SGD 默认学习率）不使用
     batch_size: int = 32
     learning_rate: float = 0.001
-    validation_split: float = 0.2
-
-# 初始化
-classifier = LightweightClassifier()
-try:
-    classifier.load('models/classifier.pkl')
-except FileNotFoundError:
-    print("警告：模型文件不存在，请先训练模型！")
-    # 创建一个新的分类器实例
-    classifier = LightweightClassifier()
+    validation_split: float = Field(0.2, gt=0, lt=1)
+    # full: 用全部数据从头训练；incremental: 只用上次训练之后的新增标注更新模型
+    mode: Literal['full', 'incremental'] = 'full'
+    # 完整训练时在训练集上做 k 折交叉验证的参数搜索
+    search: bool = False
+    cv_folds: int = Field(5, ge=2, le=20)
+    # 训练前合并主类别相同的近重复标注，每组只保留最新的一条
+    dedup: bool = False
+
+# 模型目录和数据库路径，默认相对于工作目录；基准测试用它们指向临时目录
+MODEL_DIR = os.environ.get('CLASSIFIER_MODEL_DIR', 'models')
+DB_PATH = os.environ.get('CLASSIFIER_DB_PATH', 'classifier.db')
+
+# 加载模型后编译为紧凑的推理结构；CLASSIFIER_PRUNE 为剪枝阈值，0 时预测与 sklearn 一致
+COMPILE_MODEL = os.environ.get('CLASSIFIER_COMPILE_MODEL', '1') != '0'
+PRUNE = float(os.environ.get('CLASSIFIER_PRUNE', 0))
+
+# 初始化：这里只创建轻量对象，模型、jieba 词典和数据库在 lifespan 启动阶段加载
+registry = ModelRegistry(MODEL_DIR, compiled=COMPILE_MODEL, prune=PRUNE)
+startup_state = startup.StartupState()
+classifier = None
+db = None
+llm_service = None
 processor = DataProcessor()
 
-# 数据库连接
-conn = sqlite3.connect('classifier.db')
-cursor = conn.cursor()
-
-# 创建表
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS classifications (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    text TEXT NOT NULL,
-    main_category TEXT NOT NULL,
-    sub_categories TEXT NOT NULL,
-    confidence REAL NOT NULL,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+# 近重复检测：CLASSIFIER_DEDUP_THRESHOLD 用于训练集去重（导入只跳过完全相同的文本），
+# CLASSIFIER_REUSE_THRESHOLD 用于复用近似文本的预测结果，默认为 0 即关闭（需要时显式开启：
+# 相似度是 MinHash 的估计值，会把实际相似度略低于阈值的文本也当作近重复）
+DEDUP_THRESHOLD = float(os.environ.get('CLASSIFIER_DEDUP_THRESHOLD', 0.9))
+REUSE_THRESHOLD = float(os.environ.get('CLASSIFIER_REUSE_THRESHOLD', 0))
+REUSE_CAPACITY = int(os.environ.get('CLASSIFIER_REUSE_CAPACITY', 100000))
+# 当前模型的预测结果索引，切换模型时重建
+prediction_index = None
+
+def load_classifier():
+    """加载当前线上版本的模型，没有模型文件时返回未训练的分类器"""
+    try:
+        return registry.load()
+    except FileNotFoundError:
+        logger.warning("模型文件不存在，请先训练模型！")
+        from .models import LightweightClassifier
+        # 创建一个新的分类器实例
+        return LightweightClassifier()
+
+def initialize():
+    """启动时执行一次：预加载 jieba 词典、打开数据库、加载模型并预热"""
+    global classifier, db, prediction_index
+    with startup_state.stage('jieba'):
+        startup.preload_jieba()
+    with startup_state.stage('database'):
+        db = DatabaseManager(
+            DB_PATH,
+            flush_interval=DB_FLUSH_MS / 1000,
+            flush_rows=DB_FLUSH_ROWS,
+            history_size=HISTORY_SIZE
+        )
+    with startup_state.stage('model'):
+        classifier = load_classifier()
+    with startup_state.stage('warmup'):
+        startup.warm_up(classifier)
+    prediction_index = new_prediction_index(classifier)
+
+def new_prediction_index(model):
+    """与模型共用分词器，查找时的分词结果在随后的预测中直接命中分词缓存"""
+    if not REUSE_THRESHOLD:
+        return None
+    return NearDuplicateIndex(model.tokenizer, REUSE_THRESHOLD, REUSE_CAPACITY)
+
+# 分类结果缓存，CLASSIFIER_CACHE_MB 为 0 时关闭
+CACHE_MB = float(os.environ.get('CLASSIFIER_CACHE_MB', 64))
+CACHE_TTL = float(os.environ.get('CLASSIFIER_CACHE_TTL', 3600))
+prediction_cache = PredictionCache(int(CACHE_MB * 1024 * 1024), CACHE_TTL)
+
+# 线程池配置，可通过环境变量调整
+INFERENCE_WORKERS = int(os.environ.get('CLASSIFIER_INFERENCE_WORKERS', os.cpu_count() or 4))
+INFERENCE_MAX_QUEUE = int(os.environ.get('CLASSIFIER_INFERENCE_MAX_QUEUE', 64))
+LLM_WORKERS = int(os.environ.get('CLASSIFIER_LLM_WORKERS', 8))
+LLM_MAX_QUEUE = int(os.environ.get('CLASSIFIER_LLM_MAX_QUEUE', 32))
+
+# 推理线程池：模型预测不在事件循环中执行
+inference_pool = WorkerPool('inference', INFERENCE_WORKERS, INFERENCE_MAX_QUEUE)
+# 大模型建议服务（启动时创建）：异步客户端共用连接池，限制并发和排队深度，按文本缓存结果
+
+async def run_in_pool(pool, func, *args):
+    """在线程池中执行任务，队列已满时返回 503"""
+    try:
+        return await pool.run(func, *args)
+    except WorkerBusyError:
+        raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+
+def predict_texts(model, index, texts):
+    """在推理线程中预测一批文本，返回接口格式的结果
+
+    index 不为 None 时先查找近重复文本，命中则直接复用其预测结果，
+    只预测未命中的文本，新的结果写回索引。结果中的 reused 标明是否复用了
+    其他文本的预测，复用时 reused_similarity 为估计的相似度。
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        match = index.find(text) if index is not None else None
+        if match is not None:
+            results[i] = dict(match.value, reused=True, reused_similarity=match.similarity)
+        else:
+            pending.append(i)
+
+    if pending:
+        predictions = model.predict_many([texts[i] for i in pending])
+        for i, prediction in zip(pending, predictions):
+            results[i] = {
+                "category": str(prediction.get('category', '未知')),
+                "sub_categories": prediction.get('sub_categories', []),
+                "confidence": float(prediction.get('confidence', 0.0)),
+                "entropy": float(prediction.get('entropy', 0.0)),
+                "reused": False
+            }
+            if index is not None:
+                index.add(texts[i], results[i])
+    return results
+
+def swap_classifier(new_classifier):
+    """整体替换线上模型，进行中的请求继续使用旧模型完成"""
+    global classifier, prediction_index
+    classifier = new_classifier
+    # 旧版本的缓存结果不会再被命中，直接释放
+    prediction_cache.clear()
+    prediction_index = new_prediction_index(new_classifier)
+    evaluation_reports.clear()
+    logger.info("线上模型已切换到版本: %s", new_classifier.version)
+
+# 后台重训练任务，TRAIN_JOBS 为训练进程内并行分词和参数搜索的进程数，
+# KEEP_VERSIONS 为除线上版本外保留的最新模型版本数
+TRAIN_JOBS = int(os.environ.get('CLASSIFIER_TRAIN_JOBS', os.cpu_count() or 1))
+KEEP_VERSIONS = int(os.environ.get('CLASSIFIER_KEEP_VERSIONS', 5))
+retrain_jobs = RetrainJobManager(registry, swap_classifier, keep_versions=KEEP_VERSIONS)
+retrain_lock = asyncio.Lock()
+
+# 数据库：每线程独立连接 + WAL，分类记录由后台写线程批量提交
+DB_FLUSH_MS = float(os.environ.get('CLASSIFIER_DB_FLUSH_MS', 5))
+DB_FLUSH_ROWS = int(os.environ.get('CLASSIFIER_DB_FLUSH_ROWS', 500))
+# 内存中保留的最近分类记录条数
+HISTORY_SIZE = int(os.environ.get('CLASSIFIER_HISTORY_SIZE', 100))
+
+
+# /metrics 导出时才读取的运行状态
+metrics.REGISTRY.gauge(
+    'classifier_inference_pending', '推理线程池中执行和排队的任务数',
+    lambda: inference_pool.pending
+)
+metrics.REGISTRY.gauge(
+    'classifier_llm_pending', '进行中和排队的大模型请求数',
+    lambda: llm_service.pending if llm_service is not None else None
+)
+metrics.REGISTRY.gauge(
+    'classifier_db_write_queue_depth', '等待写线程提交的分类记录批次数',
+    lambda: db.writer.queue_depth if db is not None else None
+)
+metrics.REGISTRY.gauge(
+    'classifier_cache_hits_total', '分类结果缓存命中次数',
+    lambda: prediction_cache.hits, 'counter'
+)
+metrics.REGISTRY.gauge(
+    'classifier_cache_misses_total', '分类结果缓存未命中次数',
+    lambda: prediction_cache.misses, 'counter'
 )
-''')
-conn.commit()
-
-# 创建标注数据表
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS annotations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    text TEXT NOT NULL,
-    main_category TEXT NOT NULL,
-    sub_categories TEXT NOT NULL,
-    source TEXT NOT NULL,  -- 'human' 或 'model'
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+metrics.REGISTRY.gauge(
+    'classifier_cache_hit_ratio', '分类结果缓存命中率',
+    lambda: prediction_cache.stats()['hit_rate']
 )
-''')
-conn.commit()
+metrics.REGISTRY.gauge(
+    'classifier_cache_size_bytes', '分类结果缓存估算占用',
+    lambda: prediction_cache.size_bytes
+)
+metrics.REGISTRY.gauge(
+    'classifier_model_info', '线上模型版本',
+    lambda: {(('version', classifier.version),): 1} if classifier is not None else None
+)
+metrics.REGISTRY.gauge(
+    'classifier_ready', '服务是否就绪',
+    lambda: 1 if startup_state.ready else 0
+)
+
+
+metrics.REGISTRY.gauge(
+    'classifier_dedup_items', '近重复索引中的文本数',
+    lambda: {
+        (('index', name),): len(index)
+        for name, index in (('predictions', prediction_index),)
+        if index is not None
+    }
+)
+metrics.REGISTRY.gauge(
+    'classifier_dedup_collapsed_total', '被判定为近重复而合并的文本数',
+    lambda: {
+        (('index', name),): index.collapsed
+        for name, index in (('predictions', prediction_index),)
+        if index is not None
+    },
+    'counter'
+)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的指标"""
+    return PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@app.get("/ready")
+async def readiness():
+    """就绪检查：模型加载并预热完成后返回 200，启动中或停止中返回 503"""
+    body = {
+        **startup_state.to_dict(),
+        "model_version": classifier.version if classifier is not None else None
+    }
+    return JSONResponse(body, status_code=200 if startup_state.ready else 503)
 
 
 @app.post("/classify")
@@ -87,44 +312,24 @@ async def classify_text(request: TextRequest):
             )
 
         # 预处理文本
-        processed_text = processor.preprocess_text(request.text)
+        with metrics.stage_timer('preprocess'):
+            processed_text = processor.preprocess_text(request.text)
         
-        # 预测
-        prediction = classifier.predict(processed_text)
+        # 预测（先查结果缓存，同一模型版本下相同文本直接复用）
+        model = classifier
+        result = prediction_cache.get(model.version, processed_text)
+        if result is None:
+            result = (await run_in_pool(
+                inference_pool, predict_texts, model, prediction_index, [processed_text]
+            ))[0]
+            prediction_cache.put(model.version, processed_text, result)
         
-        # 构造返回结果
-        result = {
-            "category": str(prediction.get('category', '未知')),
-            "sub_categories": prediction.get('sub_categories', []),
-            "confidence": float(prediction.get('confidence', 0.0))
-        }
+        # 保存到数据库，等待后台写线程提交
+        with metrics.stage_timer('db_write'):
+            await asyncio.wrap_future(db.save_classification(request.text, result))
         
-        # 保存到数据库
-        cursor.execute('''
-        INSERT INTO classifications (text, main_category, sub_categories, confidence)
-        VALUES (?, ?, ?, ?)
-        ''', (
-            request.text,
-            result["category"],
-            json.dumps(result["sub_categories"]),
-            result["confidence"]
-        ))
-        conn.commit()  # 确保提交事务
-        
-        # 获取最新的历史记录
-        cursor.execute('''
-        SELECT * FROM classifications 
-        ORDER BY timestamp DESC 
-        LIMIT 10
-        ''')
-        
-        columns = ['id', 'text', 'main_category', 'sub_categories', 
-                  'confidence', 'timestamp']
-        history = []
-        for row in cursor.fetchall():
-            item = dict(zip(columns, row))
-            item['sub_categories'] = json.loads(item['sub_categories'])
-            history.append(item)
+        # 获取最新的历史记录（内存缓冲区，无需查询数据库）
+        history = db.recent_classifications(10)
         
         # 返回分类结果和最新历史记录
         return {
@@ -132,43 +337,86 @@ async def classify_text(request: TextRequest):
             "history": history
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"分类错误: {str(e)}")  # 添加错误日志
+        logger.exception("分类错误")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/classify/batch")
+async def classify_batch(request: BatchTextRequest):
+    """批量分类：整批一次预测，结果在一个事务中写入数据库"""
+    try:
+        if not request.texts:
+            raise HTTPException(status_code=400, detail="输入文本列表不能为空")
+        if len(request.texts) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"单次最多分类{MAX_BATCH_SIZE}条文本"
+            )
+        if any(not text or not text.strip() for text in request.texts):
+            raise HTTPException(status_code=400, detail="输入文本不能为空")
+
+        with metrics.stage_timer('preprocess'):
+            processed_texts = processor.preprocess_many(request.texts)
+
+        # 先查结果缓存，只预测未命中的文本，批内重复文本只预测一次
+        model = classifier
+        results = [prediction_cache.get(model.version, text) for text in processed_texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            unique_texts = list(dict.fromkeys(processed_texts[i] for i in missing))
+            predictions = await run_in_pool(
+                inference_pool, predict_texts, model, prediction_index, unique_texts
+            )
+
+            predicted = dict(zip(unique_texts, predictions))
+            for text, result in predicted.items():
+                prediction_cache.put(model.version, text, result)
+            for i in missing:
+                results[i] = predicted[processed_texts[i]]
+
+        # 整批在同一个事务中用 executemany 写入
+        with metrics.stage_timer('db_write'):
+            await asyncio.wrap_future(db.save_classifications(list(zip(request.texts, results))))
+
+        return {
+            "count": len(results),
+            "results": results
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("批量分类错误", extra={"batch_size": len(request.texts)})
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/history")
 async def get_history(limit: int = 10):
     try:
-        # 添加调试日志
-        print(f"获取历史记录，限制数量: {limit}")
-        
-        cursor.execute('''
-        SELECT id, text, main_category, sub_categories, confidence, timestamp
-        FROM classifications 
-        ORDER BY timestamp DESC 
-        LIMIT ?
-        ''', (limit,))
-        
-        columns = ['id', 'text', 'main_category', 'sub_categories', 
-                  'confidence', 'timestamp']
-        results = []
-        
-        for row in cursor.fetchall():
-            result = dict(zip(columns, row))
-            # 确保 sub_categories 是 JSON 格式
-            try:
-                result['sub_categories'] = json.loads(result['sub_categories'])
-            except:
-                result['sub_categories'] = []
-            results.append(result)
-            
-        # 添加调试日志
-        print(f"找到 {len(results)} 条历史记录")
+        # 缓冲区容量以内直接从内存返回，更大的 limit 按主键倒序查询
+        results = db.recent_classifications(limit)
+        logger.debug("获取历史记录: 限制 %d 条，找到 %d 条", limit, len(results))
         return results
     except Exception as e:
-        print(f"获取历史记录错误: {str(e)}")  # 添加错误日志
+        logger.exception("获取历史记录错误")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/dedup-stats")
+async def get_dedup_stats():
+    """复用预测结果的近重复索引的规模和合并统计，未开启时为 None"""
+    return {
+        "predictions": prediction_index.stats() if prediction_index is not None else None
+    }
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """分类结果缓存的命中统计"""
+    return {
+        "model_version": classifier.version,
+        **prediction_cache.stats()
+    }
+
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """
@@ -184,19 +432,23 @@ async def annotate(request: Request):
     try:
         data = await request.json()
         
+        cursor = db.cursor()
         # 插入标注数据
         cursor.execute('''
         INSERT INTO annotations 
-        (text, main_category, sub_categories, source, timestamp)
-        VALUES (?, ?, ?, ?, ?)
+        (text, main_category, sub_categories, source, timestamp, annotator)
+        VALUES (?, ?, ?, ?, ?, ?)
         ''', (
             data['text'],
             data['main_category'],
             json.dumps(data['sub_categories']),
             'human',
-            datetime.now()
+            datetime.now(),
+            data.get('annotator')
         ))
-        conn.commit()
+        # 已标注的文本移出待标注队列
+        db.mark_annotated([data['text']])
+        db.conn.commit()
         
         # 立即返回新插入的数据
         return {
@@ -212,9 +464,21 @@ async def annotate(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/annotation-queue")
+async def get_annotation_queue(limit: int = 20):
+    """主动学习待标注队列：模型最不确定且尚未人工标注的文本"""
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit 必须在 1 到 {MAX_PAGE_SIZE} 之间")
+    try:
+        return {"items": await asyncio.to_thread(db.uncertainty_queue, limit)}
+    except Exception as e:
+        logger.exception("获取待标注队列错误")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/annotations")
 async def get_annotations():
     try:
+        cursor = db.cursor()
         cursor.execute('''
         SELECT text, main_category, sub_categories, timestamp 
         FROM annotations 
@@ -234,101 +498,144 @@ async def get_annotations():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# /training-data 单页最大条数
+MAX_PAGE_SIZE = 500
+
 @app.get("/training-data")
-async def get_training_data(request: Request):
-    """获取训练数据统计信息和详细数据"""
+async def get_training_data(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None
+):
+    """获取训练数据统计信息和分页的详细数据
+
+    按 (timestamp, id) 倒序做键集分页：把返回的 next_cursor 作为 cursor 传入获取下一页。
+    统计信息只在第一页（不带 cursor）时返回；limit=0 时只返回统计信息。
+    """
     try:
-        # 获取数据总量和类别数
-        cursor.execute('''
-        SELECT COUNT(*) as total,
-               COUNT(DISTINCT main_category) as categories
-        FROM annotations 
-        WHERE source = 'human'
-        ''')
-        stats = dict(zip(['total', 'categories'], cursor.fetchone()))
-        
-        # 获取各类别数据分布
-        cursor.execute('''
-        SELECT main_category, COUNT(*) as count
-        FROM annotations 
-        WHERE source = 'human'
-        GROUP BY main_category
-        ''')
-        category_distribution = dict(cursor.fetchall())
+        if limit < 0 or limit > MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"limit 需在 0 到 {MAX_PAGE_SIZE} 之间")
         
-        # 获取详细的训练数据
-        cursor.execute('''
-        SELECT id, text, main_category, sub_categories, timestamp
-        FROM annotations 
-        WHERE source = 'human'
-        ORDER BY timestamp DESC
-        ''')
+        response = {}
+        if cursor is None:
+            # 一次分组查询同时得到总量、类别数和分布
+            category_distribution = db.annotation_distribution()
+            response["stats"] = {
+                "total": sum(category_distribution.values()),
+                "categories": len(category_distribution)
+            }
+            response["distribution"] = category_distribution
         
-        columns = ['id', 'text', 'main_category', 'sub_categories', 'timestamp']
-        detailed_data = []
-        for row in cursor.fetchall():
-            item = dict(zip(columns, row))
-            item['sub_categories'] = json.loads(item['sub_categories'])
-            detailed_data.append(item)
+        detailed_data, next_cursor = [], None
+        if limit > 0:
+            try:
+                detailed_data, next_cursor = db.get_annotation_page(limit, cursor, category)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        return {
-            "stats": stats,
-            "distribution": category_distribution,
-            "data": detailed_data
-        }
+        response["data"] = detailed_data
+        response["next_cursor"] = next_cursor
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/retrain")
+@app.post("/retrain", status_code=202)
 async def retrain_model(config: TrainingConfig):
+    """提交后台重训练任务，立即返回任务ID"""
     try:
-        # 获取所有人工标注数据
-        cursor.execute('''
-        SELECT text, main_category, sub_categories 
-        FROM annotations 
-        WHERE source = 'human'
-        ''')
+        # 检查、去重和创建任务之间有 await，串行执行，避免两个请求同时通过检查
+        async with retrain_lock:
+            active_job = retrain_jobs.active_job()
+            if active_job is not None:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"已有训练任务在进行中: {active_job.id}"
+                )
         
-        training_data = []
-        for row in cursor.fetchall():
-            text, category, sub_categories = row
-            training_data.append({
-                'text': text,
-                'category': category,
-                'sub_categories': json.loads(sub_categories)
-            })
+            training_kwargs = {
+                'stopwords': processor.stopwords,
+                'n_jobs': TRAIN_JOBS,
+                'validation_split': config.validation_split,
+                'epochs': config.epochs
+            }
+            if config.search:
+                training_kwargs.update(search=True, cv=config.cv_folds)
+            last_annotation_id = None
+            if config.mode == 'incremental':
+                if classifier.incremental and classifier.last_annotation_id is not None:
+                    # 在线上增量模型的基础上只训练新增的标注
+                    last_annotation_id = classifier.last_annotation_id
+                    training_kwargs['base_model_path'] = registry.path_for(classifier.version)
+                else:
+                    # 线上模型不支持增量更新时，先用全部数据训练一个增量模式的模型
+                    training_kwargs['incremental'] = True
         
-        if not training_data:
-            raise HTTPException(status_code=400, detail="没有足够的训练数据")
+            cursor = db.cursor()
+            # 获取人工标注数据（增量模式只取上次训练之后的新增数据）
+            cursor.execute('''
+            SELECT id, text, main_category 
+            FROM annotations 
+            WHERE source = 'human' AND id > ?
+            ORDER BY id
+            ''', (last_annotation_id or 0,))
+            training_data = cursor.fetchall()
         
-        try:
-            # 打印调试信息
-            print(f"训练数据数量: {len(training_data)}")
-            print(f"训练配置: {config}")
-            
-            # 使用配置参数重新训练模型
-            classifier.train(
-                [item['text'] for item in training_data],
-                [item['category'] for item in training_data]
-                # 注意：移除了额外的参数，因为 LightweightClassifier 的 train 方法可能不接受这些参数
+            if not training_data:
+                if last_annotation_id is not None:
+                    raise HTTPException(status_code=400, detail="没有新增的标注数据")
+                raise HTTPException(status_code=400, detail="没有足够的训练数据")
+        
+            texts = [text for _, text, _ in training_data]
+            labels = [category for _, _, category in training_data]
+            duplicates = 0
+            if config.dedup and DEDUP_THRESHOLD:
+                # 主类别相同的近重复标注只保留最新的一条；索引只在本次请求中临时构建
+                from .tokenizer import Tokenizer
+                kept = await asyncio.to_thread(
+                    dedupe, texts, labels, Tokenizer(processor.stopwords), DEDUP_THRESHOLD, 'last'
+                )
+                duplicates = len(texts) - len(kept)
+                texts = [texts[i] for i in kept]
+                labels = [labels[i] for i in kept]
+        
+            logger.info(
+                "提交重训练任务",
+                extra={"data_count": len(texts), "duplicates": duplicates, "config": config.dict()}
             )
-            
-            # 保存模型
-            classifier.save('models/classifier.pkl')
-            
-            return {
-                "status": "success", 
-                "message": "模型重新训练完成",
-                "config": config.dict()
-            }
-        except Exception as e:
-            print(f"训练过程错误: {str(e)}")  # 打印具体错误信息
-            raise HTTPException(status_code=500, detail=f"训练过程错误: {str(e)}")
-            
+        
+            job = retrain_jobs.create(config.dict())
+            retrain_jobs.start(
+                job,
+                texts,
+                labels,
+                last_annotation_id=training_data[-1][0],
+                **training_kwargs
+            )
+        
+        return {
+            "status": "accepted",
+            "message": "模型重训练任务已提交",
+            "job_id": job.id,
+            "config": config.dict(),
+            "data_count": len(texts),
+            "duplicates": duplicates
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"重训练接口错误: {str(e)}")  # 打印具体错误信息
+        logger.exception("重训练接口错误")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/retrain/{job_id}")
+async def get_retrain_job(job_id: str):
+    """查询重训练任务的状态、进度和验证集准确率"""
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="训练任务不存在")
+    return job.to_dict()
+
 @app.get("/training", response_class=HTMLResponse)
 async def training_page(request: Request):
     """返回训练页面"""
@@ -338,37 +645,87 @@ async def training_page(request: Request):
     )
 
 @app.post("/import-annotations")
-async def import_annotations(request: Request):
+async def import_annotations(request: Request, format: Optional[str] = None, dedup: bool = False):
+    """导入人工标注
+
+    - JSON 数组（默认）：一次返回导入结果
+    - NDJSON / CSV（format 参数或 Content-Type 指定）：请求体先流式写入临时文件，
+      再逐块校验并分事务写入，响应为 NDJSON 格式的进度，每写入一块输出一行
+
+    dedup 为 True 时跳过与已有标注（或本次已导入的记录）文本完全相同的记录，计入 duplicates。
+    """
     try:
-        data = await request.json()
-        for item in data:
-            cursor.execute('''
-            INSERT INTO annotations (text, main_category, sub_categories, source)
-            VALUES (?, ?, ?, ?)
-            ''', (
-                item['text'],
-                item['main_category'],
-                json.dumps(item['sub_categories']),
-                'human'
-            ))
-        conn.commit()
-        return {"status": "success", "message": f"成功导入{len(data)}条数据"}
+        fmt = bulk_io.detect_format(format, request.headers.get('content-type', ''))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if fmt == 'json':
+            data = await request.json()
+            if not isinstance(data, list):
+                raise HTTPException(status_code=400, detail="JSON 导入数据必须是数组")
+            importer = bulk_io.AnnotationImporter(
+                db, ((i, item, None) for i, item in enumerate(data, 1)), classifier.categories,
+                dedup=dedup
+            )
+            while not importer.done:
+                await asyncio.to_thread(importer.import_chunk)
+            return {
+                "message": f"成功导入{importer.imported}条数据",
+                **importer.progress()
+            }
+        
+        # 请求体超过阈值后落盘，内存占用不随文件大小增长
+        upload = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    importer = bulk_io.AnnotationImporter(
+        db, bulk_io.iter_records(upload, fmt), classifier.categories, dedup=dedup
+    )
+    
+    async def progress_stream():
+        try:
+            while not importer.done:
+                await asyncio.to_thread(importer.import_chunk)
+                yield json.dumps(importer.progress(), ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.exception("导入标注数据错误")
+            yield json.dumps({"status": "error", "detail": str(e), **{
+                k: v for k, v in importer.progress().items() if k != "status"
+            }}, ensure_ascii=False) + '\n'
+        finally:
+            upload.close()
+    
+    return StreamingResponse(progress_stream(), media_type="application/x-ndjson")
 
 @app.get("/export-annotations")
-async def export_annotations():
-    try:
-        cursor.execute('SELECT * FROM annotations WHERE source = "human"')
-        data = cursor.fetchall()
-        return {"data": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def export_annotations(format: str = 'json'):
+    """流式导出人工标注：json（与旧版格式相同）、ndjson 或 csv，逐页读取数据库"""
+    exporters = {
+        'json': (bulk_io.export_json, "application/json"),
+        'ndjson': (bulk_io.export_ndjson, "application/x-ndjson"),
+        'csv': (bulk_io.export_csv, "text/csv; charset=utf-8")
+    }
+    if format not in exporters:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    
+    exporter, media_type = exporters[format]
+    headers = {}
+    if format != 'json':
+        headers["Content-Disposition"] = f'attachment; filename="annotations.{format}"'
+    return StreamingResponse(exporter(db), media_type=media_type, headers=headers)
 
 @app.post("/review-annotation")
 async def review_annotation(request: Request):
     data = await request.json()
     try:
+        cursor = db.cursor()
         cursor.execute('''
         UPDATE annotations 
         SET review_status = ?, reviewer_comments = ?
@@ -378,7 +735,7 @@ async def review_annotation(request: Request):
             data['comments'],
             data['annotation_id']
         ))
-        conn.commit()
+        db.conn.commit()
         return {"status": "success"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -386,6 +743,7 @@ async def review_annotation(request: Request):
 @app.get("/annotation-stats")
 async def get_annotation_stats():
     try:
+        cursor = db.cursor()
         # 按时间统计
         cursor.execute('''
         SELECT DATE(timestamp) as date, COUNT(*) as count
@@ -412,31 +770,71 @@ async def get_annotation_stats():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 评估时按进程分片预测的进程数
+EVAL_JOBS = int(os.environ.get('CLASSIFIER_EVAL_JOBS', 1))
+# 评估报告缓存：(模型版本, 测试集签名) -> 报告，切换模型时清空
+evaluation_reports = {}
+
+def _run_evaluation(model, test_data):
+    """在推理线程中完成整批预测和指标计算"""
+    # sklearn.metrics 只在评估时导入
+    from . import evaluation
+
+    texts = processor.preprocess_many([text for text, _, _ in test_data])
+    predictions = evaluation.predict_sharded(
+        model, texts, registry.path_for(model.version), EVAL_JOBS
+    )
+    true_categories = [category for _, category, _ in test_data]
+    true_sub_categories = [json.loads(subs) for _, _, subs in test_data]
+    
+    results = []
+    for (text, true_category, _), prediction in zip(test_data, predictions):
+        results.append({
+            "text": text,
+            "true_category": true_category,
+            "predicted_category": prediction["category"],
+            "confidence": prediction["confidence"]
+        })
+    
+    report = evaluation.evaluate_predictions(predictions, true_categories, true_sub_categories)
+    return {
+        "evaluation_results": results,
+        "accuracy": report["accuracy"],
+        "report": report
+    }
+
 @app.post("/evaluate-model")
 async def evaluate_model():
     try:
+        model = classifier
+        cursor = db.cursor()
+        # 测试集签名：测试集增删时变化，用于判断缓存的报告是否仍然有效
+        cursor.execute('''
+        SELECT COUNT(*), MAX(id), TOTAL(id)
+        FROM annotations
+        WHERE is_test_set = 1 AND source = 'human'
+        ''')
+        signature = cursor.fetchone()
+        if signature[0] == 0:
+            raise HTTPException(status_code=400, detail="没有测试集数据")
+        
+        cache_key = (model.version, signature)
+        if cache_key in evaluation_reports:
+            return evaluation_reports[cache_key]
+        
         # 获取测试数据
         cursor.execute('''
         SELECT text, main_category, sub_categories
         FROM annotations
-        WHERE source = 'human' AND is_test_set = 1
+        WHERE is_test_set = 1 AND source = 'human'
         ''')
         test_data = cursor.fetchall()
         
-        results = []
-        for text, true_category, true_sub_categories in test_data:
-            prediction = classifier.predict(text)
-            results.append({
-                "text": text,
-                "true_category": true_category,
-                "predicted_category": prediction["category"],
-                "confidence": prediction["confidence"]
-            })
-            
-        return {
-            "evaluation_results": results,
-            "accuracy": sum(1 for r in results if r["true_category"] == r["predicted_category"]) / len(results)
-        }
+        report = await run_in_pool(inference_pool, _run_evaluation, model, test_data)
+        evaluation_reports[cache_key] = report
+        return report
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -444,81 +842,28 @@ async def evaluate_model():
 async def get_ai_suggestion(request: TextRequest):
     try:
         text = request.text
+        if llm_service is None:
+            raise HTTPException(status_code=503, detail="大模型未配置")
         
-        # 构建 prompt
-        prompt = f"""请分析以下文本的价值观倾向，并给出详细解释。
-文本："{text}"
-
-请从以下类别中选择：
-主类别：
-- 正向价值观（包含：爱国、敬业、诚信、友善、和谐、公平、正义）
-- 负向价值观（包含：暴力、歧视、谣言、极端、违法、不当言论）
-- 中性（包含：客观描述、日常交流）
-
-请按照以下格式输出：
-主类别：[类别名]
-子类别：[相关的具体子类别，可多选]
-分析理由：[详细解释为什么属于这个类别]"""
-
-        client = OpenAI(
-            base_url='https://api.openai-proxy.org/v1',
-            api_key='sk-nJcHY4m9MtnA5BfE6y9mnsKe1Kcz9JiAB6F4YYvt6WHhqres',
-        )
-
-        # 调用 OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "你是一个专业的文本分类助手，擅长分析文本中的价值观倾向。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        
-        # 解析 AI 响应
-        ai_response = response.choices[0].message.content
-        print(ai_response)
-        # 解析响应内容
-        category = ""
-        sub_categories = []
-        explanation = ""
-        
-        # 更精确的响应解析
-        lines = ai_response.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('主类别：'):
-                category = line.replace('主类别：', '').strip()
-            elif line.startswith('子类别：'):
-                sub_cats = line.replace('子类别：', '').strip()
-                # 处理可能的不同分隔符
-                if '、' in sub_cats:
-                    sub_categories = [cat.strip() for cat in sub_cats.split('、')]
-                elif ',' in sub_cats:
-                    sub_categories = [cat.strip() for cat in sub_cats.split(',')]
-                elif '，' in sub_cats:
-                    sub_categories = [cat.strip() for cat in sub_cats.split('，')]
-                else:
-                    sub_categories = [sub_cats]
-                # 过滤空字符串
-                sub_categories = [cat for cat in sub_categories if cat]
-            elif line.startswith('分析理由：'):
-                explanation = line.replace('分析理由：', '').strip()
-        
-        # 获取模型的分类结果
-        model_prediction = classifier.predict(text)
+        # 大模型调用和本地模型预测同时进行
+        try:
+            suggestion, model_prediction = await asyncio.gather(
+                llm_service.suggest(text),
+                run_in_pool(inference_pool, classifier.predict, text)
+            )
+        except WorkerBusyError:
+            raise HTTPException(status_code=503, detail="大模型服务繁忙，请稍后重试")
         
-        # 打印调试信息
-        print(f"AI Response: {ai_response}")
-        print(f"Parsed Category: {category}")
-        print(f"Parsed Sub-categories: {sub_categories}")
-        print(f"Parsed Explanation: {explanation}")
+        logger.debug("大模型建议", extra={
+            "raw_response": suggestion['raw_response'],
+            "category": suggestion['category'],
+            "sub_categories": suggestion['sub_categories']
+        })
         
         return {
-            "category": category,
-            "sub_categories": sub_categories,
-            "explanation": explanation,
+            "category": suggestion["category"],
+            "sub_categories": suggestion["sub_categories"],
+            "explanation": suggestion["explanation"],
             "model_prediction": {
                 "category": model_prediction["category"],
                 "sub_categories": model_prediction["sub_categories"],
@@ -526,6 +871,10 @@ async def get_ai_suggestion(request: TextRequest):
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"AI建议生成错误: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        logger.exception("AI建议生成错误")
+        raise HTTPException(status_code=500, detail=str(e))
+
+startup_state.timings['import'] = round(time.perf_counter() - _IMPORT_STARTED, 4)
@@ -0,0 +1,58 @@
+"""运行全部基准并与基线比较
+
+    python -m text_classifier.benchmarks [--rows 20000] [--requests 2000]
+        [--baseline benchmarks/baseline.json] [--tolerance 0.2] [--update]
+
+基线文件不存在时写入本次结果；存在时逐项比较，有指标变差超过 tolerance 则以状态码 1 退出，
+--update 用本次结果覆盖基线。基线与机器相关，应在同一台机器（或同规格的 CI 机器）上比较。
+"""
+import argparse
+import sys
+
+from . import baseline, load, micro
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000, help='训练和微基准使用的语料行数')
+    parser.add_argument('--requests', type=int, default=2000, help='压测每个接口的请求数')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--baseline', type=str, default='benchmarks/baseline.json')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的相对退化幅度')
+    parser.add_argument('--update', action='store_true', help='用本次结果覆盖基线')
+    parser.add_argument('--skip_load', action='store_true', help='只运行微基准')
+    args = parser.parse_args(argv)
+
+    results, classifier = micro.run(args.rows)
+    if not args.skip_load:
+        results.update(load.run(classifier, args.requests, args.concurrency))
+
+    for name, metrics in results.items():
+        print(name)
+        for metric, value in metrics.items():
+            print(f"  {metric:<28} {value:.4f}" if isinstance(value, float) else f"  {metric:<28} {value}")
+
+    config = {"rows": args.rows, "requests": args.requests, "concurrency": args.concurrency}
+    previous = baseline.load_baseline(args.baseline)
+    if previous is None or args.update:
+        baseline.save_baseline(args.baseline, results, config)
+        print(f"基线已写入 {args.baseline}")
+        return 0
+
+    if previous['config'] != config:
+        print(f"警告: 本次参数 {config} 与基线参数 {previous['config']} 不同，结果不可直接比较")
+    regressions = baseline.compare(results, previous['results'], args.tolerance)
+    if not regressions:
+        print(f"与基线 {args.baseline} 相比没有超过 {args.tolerance:.0%} 的退化")
+        return 0
+    print(f"与基线 {args.baseline} 相比以下指标退化超过 {args.tolerance:.0%}:")
+    for item in regressions:
+        print(
+            f"  {item['benchmark']}.{item['metric']}: "
+            f"{item['baseline']:.4f} -> {item['current']:.4f} ({item['change']:+.1%})"
+        )
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
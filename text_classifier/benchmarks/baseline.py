@@ -0,0 +1,88 @@
+"""基准结果的统计、保存和回归比较
+
+结果为 {基准名: {指标名: 数值}}。指标名决定比较方向：
+*_per_second 和 accuracy 越大越好，*_seconds / *_ms 越小越好，其余指标只记录不比较。
+"""
+import json
+import os
+import platform
+from datetime import datetime
+
+
+def percentile(values, q):
+    """values 的第 q 百分位数（最近秩法），values 为空时返回 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies, elapsed):
+    """单次操作耗时列表（秒）汇总为吞吐和 p50 / p99（毫秒）"""
+    return {
+        "count": len(latencies),
+        "ops_per_second": len(latencies) / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+def _direction(metric):
+    if metric.endswith('_per_second') or metric == 'accuracy':
+        return 1
+    if metric.endswith('_seconds') or metric.endswith('_ms'):
+        return -1
+    return 0
+
+
+def compare(results, baseline, tolerance=0.2):
+    """与基线比较，返回变差超过 tolerance（相对值）的指标列表"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            direction = _direction(metric)
+            old = baseline.get(name, {}).get(metric)
+            if not direction or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * direction
+            if change < -tolerance:
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": value,
+                    "change": change
+                })
+    return regressions
+
+
+def load_baseline(path):
+    """读取基线文件（结果、配置和运行环境），文件不存在时返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, config):
+    """保存结果及运行环境，不同机器上的基线不可直接比较"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": config,
+        "results": results
+    }
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,138 @@
+"""合成中文语料生成器
+
+按类别和子类别的关键词与通用填充词拼出带标注的文本，可以流式生成任意行数，
+长度和重复率可配置，用于基准测试和压力测试。
+
+生成 CSV（列与 data/train.csv 相同，另加 sub_categories）：
+    python -m text_classifier.benchmarks.corpus --rows 1000000 --out data/synthetic.csv
+"""
+import argparse
+import csv
+import json
+import random
+
+# 各子类别的关键词，类别结构与 LightweightClassifier.categories 一致
+KEYWORDS = {
+    "正向价值观": {
+        "爱国": ["祖国", "国家", "民族", "国旗", "爱国", "家乡", "山河"],
+        "敬业": ["工作", "认真", "负责", "专注", "努力", "加班", "岗位"],
+        "诚信": ["诚实", "守信", "信用", "承诺", "真诚", "不欺骗"],
+        "友善": ["友好", "善良", "关心", "帮助", "邻居", "微笑", "温暖"],
+        "和谐": ["和谐", "团结", "和睦", "包容", "共处"],
+        "公平": ["公平", "公正", "平等", "规则", "机会"],
+        "正义": ["正义", "见义勇为", "伸张", "维护", "保护"],
+    },
+    "负向价值观": {
+        "暴力": ["暴力", "打人", "殴打", "威胁", "伤害"],
+        "歧视": ["歧视", "看不起", "排斥", "偏见"],
+        "谣言": ["谣言", "造谣", "传谣", "假消息", "不实"],
+        "极端": ["极端", "仇恨", "煽动", "激进"],
+        "违法": ["违法", "犯罪", "偷窃", "诈骗", "走私"],
+        "不当言论": ["辱骂", "脏话", "侮辱", "嘲讽"],
+    },
+    "中性": {
+        "客观描述": ["报道", "数据", "统计", "显示", "介绍", "记录"],
+        "日常交流": ["吃饭", "天气", "周末", "上班", "电影", "朋友"],
+    },
+}
+
+# 不带倾向的填充词
+FILLER = [
+    "我们", "今天", "大家", "一起", "社会", "生活", "时候", "觉得", "事情", "城市",
+    "学校", "同学", "老师", "公司", "看到", "听说", "应该", "非常", "可能", "已经",
+    "发现", "问题", "方面", "情况", "时间", "地方", "事件", "网友", "评论", "视频",
+]
+PUNCTUATION = ["，", "。", "！", "？", "；"]
+
+
+class CorpusGenerator:
+    """可复现的合成语料流
+
+    min_length / max_length 为文本的大致字数范围；signal 为关键词占词数的比例；
+    duplicate_rate 为重复输出近期已生成文本的概率（模拟转发帖、模板消息）。
+    """
+
+    # 重复文本从最近生成的这么多条中抽取，内存占用固定
+    RECENT_SIZE = 10000
+
+    def __init__(self, seed=42, min_length=10, max_length=60, duplicate_rate=0.1, signal=0.3):
+        self.rng = random.Random(seed)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.duplicate_rate = duplicate_rate
+        self.signal = signal
+        self._recent = []
+        self._labels = [
+            (category, sub_category)
+            for category, subs in KEYWORDS.items()
+            for sub_category in subs
+        ]
+
+    def _text(self, category, sub_category):
+        rng = self.rng
+        target = rng.randint(self.min_length, self.max_length)
+        keywords = KEYWORDS[category][sub_category]
+        parts = []
+        length = 0
+        while length < target:
+            word = rng.choice(keywords) if rng.random() < self.signal else rng.choice(FILLER)
+            parts.append(word)
+            length += len(word)
+            if rng.random() < 0.15:
+                parts.append(rng.choice(PUNCTUATION))
+                length += 1
+        return ''.join(parts)
+
+    def records(self, rows):
+        """产出 rows 条 (text, category, sub_categories)"""
+        rng = self.rng
+        for _ in range(rows):
+            if self._recent and rng.random() < self.duplicate_rate:
+                yield rng.choice(self._recent)
+                continue
+
+            category, sub_category = rng.choice(self._labels)
+            record = (self._text(category, sub_category), category, [sub_category])
+            if len(self._recent) < self.RECENT_SIZE:
+                self._recent.append(record)
+            else:
+                self._recent[rng.randrange(self.RECENT_SIZE)] = record
+            yield record
+
+    def dataset(self, rows):
+        """一次生成 (texts, labels) 两个列表，供训练和预测基准使用"""
+        texts, labels = [], []
+        for text, category, _ in self.records(rows):
+            texts.append(text)
+            labels.append(category)
+        return texts, labels
+
+
+def write_csv(path, rows, **options):
+    """流式写出 CSV，内存占用与行数无关"""
+    generator = CorpusGenerator(**options)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['text', 'category', 'sub_categories'])
+        for text, category, sub_categories in generator.records(rows):
+            writer.writerow([text, category, json.dumps(sub_categories, ensure_ascii=False)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--out', type=str, default='data/synthetic.csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min_length', type=int, default=10)
+    parser.add_argument('--max_length', type=int, default=60)
+    parser.add_argument('--duplicate_rate', type=float, default=0.1)
+    args = parser.parse_args()
+
+    write_csv(
+        args.out, args.rows,
+        seed=args.seed,
+        min_length=args.min_length,
+        max_length=args.max_length,
+        duplicate_rate=args.duplicate_rate
+    )
+    print(f"已生成 {args.rows} 条数据: {args.out}")
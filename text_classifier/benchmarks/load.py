@@ -0,0 +1,102 @@
+"""进程内压测：通过 httpx 的 ASGITransport 直接调用应用，测量 /classify 和 /history
+
+不经过网络和 uvicorn，测的是应用本身（预处理、推理线程池、缓存、写线程）的吞吐和延迟。
+模型和数据库放在临时目录（CLASSIFIER_MODEL_DIR / CLASSIFIER_DB_PATH），不影响线上数据；
+大模型后端使用 fake。需要在项目根目录运行（静态文件和模板使用相对路径）：
+    python -m text_classifier.benchmarks.load [--requests 2000] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from .baseline import latency_summary
+from .corpus import CorpusGenerator
+
+
+async def _worker(client, jobs, latencies, errors):
+    # 各协程共用同一个任务迭代器，取完即止
+    for method, url, body in jobs:
+        began = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        latencies.append(time.perf_counter() - began)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+
+async def _drive(client, jobs, concurrency):
+    latencies, errors = [], []
+    jobs = iter(jobs)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(client, jobs, latencies, errors) for _ in range(concurrency)
+    ))
+    results = latency_summary(latencies, time.perf_counter() - start)
+    results["errors"] = len(errors)
+    return results
+
+
+async def _run_scenarios(app, texts, concurrency, history_limit):
+    import httpx
+
+    # ASGITransport 不触发 lifespan，手动进入以加载模型和数据库
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            classify = await _drive(
+                client, [('POST', '/classify', {"text": text}) for text in texts], concurrency
+            )
+            history = await _drive(
+                client,
+                [('GET', f'/history?limit={history_limit}', None)] * len(texts),
+                concurrency
+            )
+    return {"load_classify": classify, "load_history": history}
+
+
+def run(classifier=None, requests=2000, concurrency=16, history_limit=10, seed=7):
+    """压测 /classify 和 /history，classifier 为 None 时在合成语料上训练一个模型"""
+    if classifier is None:
+        from ..models import LightweightClassifier
+
+        classifier = LightweightClassifier()
+        classifier.train(*CorpusGenerator(seed=seed - 1).dataset(5000))
+    texts = [text for text, _, _ in CorpusGenerator(seed=seed).records(requests)]
+
+    overrides = {'CLASSIFIER_LLM_BACKEND': 'fake'}
+    with tempfile.TemporaryDirectory(prefix='classifier-load-') as tmp_dir:
+        model_dir = os.path.join(tmp_dir, 'models')
+        os.makedirs(model_dir)
+        classifier.save(os.path.join(model_dir, 'classifier'))
+        overrides['CLASSIFIER_MODEL_DIR'] = model_dir
+        overrides['CLASSIFIER_DB_PATH'] = os.path.join(tmp_dir, 'classifier.db')
+
+        saved = {key: os.environ.get(key) for key in overrides}
+        os.environ.update(overrides)
+        try:
+            # api 在导入时读取上面的环境变量
+            from .. import api
+            return asyncio.run(_run_scenarios(api.app, texts, concurrency, history_limit))
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--history_limit', type=int, default=10)
+    args = parser.parse_args()
+
+    results = run(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        history_limit=args.history_limit
+    )
+    print(json.dumps(results, ensure_ascii=False, indent=2))
@@ -0,0 +1,152 @@
+"""热点路径的微基准：预处理、分词、训练、预测（sklearn 和编译模型）和 SQLite 写入
+
+数据全部来自合成语料（见 corpus），模型在基准中现场训练，不依赖 models/ 和 classifier.db。
+单独运行：python -m text_classifier.benchmarks.micro [--rows 20000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from ..data_processor import DataProcessor
+from .baseline import latency_summary
+from .corpus import CorpusGenerator
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_preprocess(texts):
+    processor = DataProcessor()
+    chars = sum(len(text) for text in texts)
+    _, single = _timed(lambda: [processor.preprocess_text(text) for text in texts])
+    _, batch = _timed(processor.preprocess_many, texts)
+    return {
+        "texts_per_second": len(texts) / single,
+        "chars_per_second": chars / single,
+        "batch_texts_per_second": len(texts) / batch,
+    }
+
+
+def bench_tokenize(texts):
+    """首轮为未命中缓存的 jieba 分词，次轮全部命中分词缓存"""
+    from ..models import LightweightClassifier
+
+    classifier = LightweightClassifier()
+    unique_texts = list(dict.fromkeys(texts))
+    _, cold = _timed(lambda: [classifier._tokenize(text) for text in unique_texts])
+    _, warm = _timed(lambda: [classifier._tokenize(text) for text in unique_texts])
+    return {
+        "texts": len(unique_texts),
+        "texts_per_second": len(unique_texts) / cold,
+        "cached_texts_per_second": len(unique_texts) / warm,
+    }
+
+
+def bench_train(texts, labels, incremental=False):
+    """完整训练（含验证集评估），返回结果和训练好的模型供预测基准使用"""
+    from ..models import LightweightClassifier
+
+    classifier = LightweightClassifier(incremental=incremental)
+    accuracy, seconds = _timed(classifier.train, texts, labels)
+    classifier.version = 'benchmark'
+    return {
+        "rows": len(texts),
+        "train_seconds": seconds,
+        "rows_per_second": len(texts) / seconds,
+        "accuracy": accuracy,
+    }, classifier
+
+
+def bench_predict(classifier, texts, batch_size=1000):
+    """逐条 predict 的延迟分布和 predict_many 的批量吞吐"""
+    latencies = []
+    start = time.perf_counter()
+    for text in texts:
+        began = time.perf_counter()
+        classifier.predict(text)
+        latencies.append(time.perf_counter() - began)
+    results = latency_summary(latencies, time.perf_counter() - start)
+
+    _, seconds = _timed(lambda: [
+        classifier.predict_many(texts[i:i + batch_size])
+        for i in range(0, len(texts), batch_size)
+    ])
+    results["batch_texts_per_second"] = len(texts) / seconds
+    return results
+
+
+def bench_db_write(rows, batch_size=100):
+    """分类记录写入路径：逐条提交的延迟、并发逐条提交（组提交）和批量提交的吞吐"""
+    from ..database import DatabaseManager
+
+    items = [
+        (text, {"category": label, "sub_categories": [], "confidence": 0.8, "entropy": 0.3})
+        for text, label in rows
+    ]
+    with tempfile.TemporaryDirectory(prefix='classifier-bench-') as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'bench.db'))
+        try:
+            # 逐条提交并等待落盘，对应 /classify 单个请求的写入延迟
+            sequential = items[:min(len(items), 500)]
+            latencies = []
+            start = time.perf_counter()
+            for item in sequential:
+                began = time.perf_counter()
+                db.save_classification(*item).result()
+                latencies.append(time.perf_counter() - began)
+            results = latency_summary(latencies, time.perf_counter() - start)
+
+            # 大量请求同时提交单条记录，由写线程攒批
+            start = time.perf_counter()
+            futures = [db.save_classification(*item) for item in items]
+            for future in futures:
+                future.result()
+            results["concurrent_rows_per_second"] = len(items) / (time.perf_counter() - start)
+
+            # /classify/batch 的整批写入
+            start = time.perf_counter()
+            futures = [
+                db.save_classifications(items[i:i + batch_size])
+                for i in range(0, len(items), batch_size)
+            ]
+            for future in futures:
+                future.result()
+            results["batch_rows_per_second"] = len(items) / (time.perf_counter() - start)
+        finally:
+            db.close()
+    return results
+
+
+def run(rows=20000, seed=42):
+    """运行全部微基准，返回 {基准名: 指标} 和训练好的模型"""
+    train_texts, train_labels = CorpusGenerator(seed=seed).dataset(rows)
+    # 预测和写入使用另一份语料，避免全部命中分词缓存
+    eval_texts, eval_labels = CorpusGenerator(seed=seed + 1).dataset(max(1000, rows // 10))
+
+    results = {
+        "preprocess_text": bench_preprocess(train_texts),
+        "tokenize": bench_tokenize(train_texts),
+    }
+    results["train"], classifier = bench_train(train_texts, train_labels)
+    results["train_incremental"], _ = bench_train(train_texts, train_labels, incremental=True)
+    results["predict"] = bench_predict(classifier, eval_texts)
+    # 编译后的推理结构（见 compiled），线上服务默认使用
+    classifier.compile()
+    results["predict_compiled"] = bench_predict(classifier, eval_texts)
+    results["db_write"] = bench_db_write(list(zip(eval_texts, eval_labels)))
+    return results, classifier
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    results, _ = run(args.rows, args.seed)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
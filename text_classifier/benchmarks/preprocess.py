@@ -0,0 +1,77 @@
+"""文本预处理基准：预编译正则实现与旧版逐字符实现的吞吐对比
+
+运行：python -m text_classifier.benchmarks.preprocess [--length 5000] [--count 200]
+"""
+import argparse
+import random
+import time
+
+from ..data_processor import DataProcessor
+
+
+def legacy_preprocess_text(text):
+    """旧版实现：逐字符判断后重新拼接，仅用于对比"""
+    text = ''.join([char for char in text if '\u4e00' <= char <= '\u9fff' or char.isspace()])
+    text = ' '.join(text.split())
+    return text
+
+
+def make_texts(count, length, seed=42):
+    """生成混有标点、英文、数字和空白的长文本"""
+    rng = random.Random(seed)
+    alphabet = (
+        [chr(c) for c in range(0x4e00, 0x4e00 + 3000)] * 6
+        + list('，。！？、；：“”（）')
+        + list('abcdefghijklmnopqrstuvwxyz0123456789')
+        + [' ', ' ', '\n', '\t', '　']
+    )
+    return [''.join(rng.choices(alphabet, k=length)) for _ in range(count)]
+
+
+def _throughput(func, texts, repeat):
+    """返回最快一轮的 (秒数, 每秒字符数)"""
+    chars = sum(len(text) for text in texts)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(texts)
+        best = min(best, time.perf_counter() - start)
+    return best, chars / best
+
+
+def run(count=200, length=5000, repeat=5):
+    texts = make_texts(count, length)
+    processor = DataProcessor()
+
+    # 新旧实现的结果必须一致
+    expected = [legacy_preprocess_text(text) for text in texts]
+    assert processor.preprocess_many(texts) == expected
+    assert [processor.preprocess_text(text) for text in texts] == expected
+
+    cases = {
+        'legacy': lambda batch: [legacy_preprocess_text(text) for text in batch],
+        'preprocess_text': lambda batch: [processor.preprocess_text(text) for text in batch],
+        'preprocess_many': processor.preprocess_many,
+    }
+    results = {}
+    for name, func in cases.items():
+        seconds, chars_per_second = _throughput(func, texts, repeat)
+        results[name] = {"seconds": seconds, "chars_per_second": chars_per_second}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--length', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.count, args.length, args.repeat)
+    baseline = results['legacy']['seconds']
+    for name, result in results.items():
+        print(
+            f"{name:<16} {result['seconds'] * 1000:8.1f} ms  "
+            f"{result['chars_per_second'] / 1e6:7.2f} M字符/秒  "
+            f"{baseline / result['seconds']:5.1f}x"
+        )
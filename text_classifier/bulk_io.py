@@ -0,0 +1,210 @@
+"""标注数据的流式导入导出
+
+导入支持 NDJSON（每行一个 JSON 对象）和 CSV，列与 DataProcessor.load_data 读取的
+训练数据一致：text、category（也接受 main_category），可选 sub_categories。
+sub_categories 可以是 JSON 列表，也可以是用 "、" 或 "," 分隔的字符串。
+"""
+import csv
+import hashlib
+import io
+import json
+
+# 导入时每个事务写入的行数
+IMPORT_CHUNK_SIZE = 1000
+# 导出时每次从数据库读取的行数
+EXPORT_PAGE_SIZE = 1000
+# 导入结果中最多返回的错误明细条数
+MAX_REPORTED_ERRORS = 20
+
+EXPORT_COLUMNS = ['id', 'text', 'category', 'sub_categories', 'timestamp']
+
+
+def detect_format(format_param, content_type):
+    """根据 format 参数或 Content-Type 判断数据格式：json / ndjson / csv"""
+    if format_param:
+        fmt = format_param.lower()
+    elif 'ndjson' in content_type or 'jsonlines' in content_type:
+        fmt = 'ndjson'
+    elif 'csv' in content_type:
+        fmt = 'csv'
+    else:
+        fmt = 'json'
+    if fmt not in ('json', 'ndjson', 'csv'):
+        raise ValueError(f"不支持的数据格式: {fmt}")
+    return fmt
+
+
+def parse_sub_categories(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return []
+        if value.startswith('['):
+            return parse_sub_categories(json.loads(value))
+        for sep in ('、', '，', ','):
+            if sep in value:
+                return [v.strip() for v in value.split(sep) if v.strip()]
+        return [value]
+    raise ValueError("sub_categories 格式不正确")
+
+
+def validate_record(record, categories):
+    """校验一条导入记录，返回可直接写入 annotations 的 (text, main_category, sub_categories)"""
+    if not isinstance(record, dict):
+        raise ValueError("记录必须是对象")
+
+    text = record.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("text 不能为空")
+
+    main_category = record.get('main_category') or record.get('category')
+    if main_category not in categories:
+        raise ValueError(f"未知的主类别: {main_category}")
+
+    sub_categories = parse_sub_categories(record.get('sub_categories'))
+    unknown = [sub for sub in sub_categories if sub not in categories[main_category]]
+    if unknown:
+        raise ValueError(f"未知的子类别: {'、'.join(unknown)}")
+
+    return text, main_category, json.dumps(sub_categories)
+
+
+def iter_records(binary_file, fmt):
+    """逐条读取上传文件中的记录，产出 (行号, 记录, 解析错误)"""
+    text_file = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text_file)
+        for record in reader:
+            yield reader.line_num, record, None
+    else:
+        for line_no, line in enumerate(text_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_no, json.loads(line), None
+            except ValueError as e:
+                yield line_no, None, f"JSON 解析错误: {str(e)}"
+
+
+class AnnotationImporter:
+    """分块导入：每次校验 chunk_size 条记录并在一个事务中写入
+
+    dedup 为 True 时跳过与已有人工标注文本完全相同的记录，文件内部重复的文本也只导入第一条。
+    只做精确匹配：近似文本可能只差一个"不"字而含义相反，不能按相似度合并。
+    """
+
+    def __init__(self, db, records, categories, chunk_size=IMPORT_CHUNK_SIZE, dedup=False):
+        self.db = db
+        self.dedup = dedup
+        # 本次已导入文本的摘要，用于跳过文件内部的重复
+        self._seen = set()
+        self.records = iter(records)
+        self.categories = categories
+        self.chunk_size = chunk_size
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.errors = []
+        self.done = False
+
+    def _record_error(self, line_no, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "error": message})
+
+    def import_chunk(self):
+        """导入下一块数据，全部读完后把 done 置为 True"""
+        rows = []
+        for line_no, record, error in self.records:
+            self.processed += 1
+            if error is None:
+                try:
+                    row = validate_record(record, self.categories)
+                except ValueError as e:
+                    error = str(e)
+                else:
+                    rows.append(row)
+            if error is not None:
+                self._record_error(line_no, error)
+            if len(rows) >= self.chunk_size:
+                break
+        else:
+            self.done = True
+
+        if self.dedup:
+            rows = self._drop_duplicates(rows)
+        self.db.insert_annotations(rows)
+        self.imported += len(rows)
+
+    def _drop_duplicates(self, rows):
+        existing = self.db.existing_annotation_texts([row[0] for row in rows])
+        kept = []
+        for row in rows:
+            digest = hashlib.blake2b(row[0].encode('utf-8'), digest_size=8).digest()
+            if row[0] in existing or digest in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(digest)
+            kept.append(row)
+        return kept
+
+    def progress(self):
+        return {
+            "status": "success" if self.done else "running",
+            "processed": self.processed,
+            "imported": self.imported,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "errors": self.errors
+        }
+
+
+def _export_record(row):
+    row_id, text, main_category, sub_categories, timestamp = row
+    return {
+        "id": row_id,
+        "text": text,
+        "category": main_category,
+        "sub_categories": json.loads(sub_categories),
+        "timestamp": timestamp
+    }
+
+
+def export_ndjson(db):
+    for rows in db.iter_annotations(EXPORT_PAGE_SIZE):
+        yield ''.join(
+            json.dumps(_export_record(row), ensure_ascii=False) + '\n' for row in rows
+        )
+
+
+def export_csv(db):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for rows in db.iter_annotations(EXPORT_PAGE_SIZE):
+        for row in rows:
+            record = _export_record(row)
+            record['sub_categories'] = json.dumps(record['sub_categories'], ensure_ascii=False)
+            writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # 没有数据时也要输出表头
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_json(db):
+    """与旧版接口相同的 {"data": [...]} 格式，逐页输出整表的原始行"""
+    yield '{"data": ['
+    separator = ''
+    for rows in db.iter_annotations(EXPORT_PAGE_SIZE, raw=True):
+        yield separator + ', '.join(json.dumps(row) for row in rows)
+        separator = ', '
+    yield ']}'
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """分类结果缓存（LRU + TTL）
+
+    以 (模型版本, 预处理后文本的哈希) 为键，转发帖、模板消息等重复文本不再重复推理。
+    模型版本不同的键互不命中；切换模型时调用 clear() 释放旧版本的结果。
+    按估算的内存占用限制总大小，超出时淘汰最久未使用的条目。
+    """
+
+    # 每个条目除结果本身外的估算开销（键、链表节点、时间戳等）
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (过期时间, 估算大小, 结果)
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _key(version, text):
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+        return (version, digest)
+
+    def get(self, version, text):
+        """命中时返回缓存的结果，否则返回 None"""
+        if not self.enabled:
+            return None
+        key = self._key(version, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, result = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, version, text, result):
+        if not self.enabled:
+            return
+        key = self._key(version, text)
+        size = self.ENTRY_OVERHEAD + len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, result)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def clear(self):
+        """清空缓存（模型重新加载或重训练后调用）"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
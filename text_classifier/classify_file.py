@@ -0,0 +1,269 @@
+"""离线批量分类：流式读取 CSV / NDJSON 文件，分块交给多个进程预处理和预测
+
+    python -m text_classifier.classify_file data/texts.csv --output results.csv
+    python -m text_classifier.classify_file data/texts.ndjson --output results.ndjson --workers 8
+    python -m text_classifier.classify_file data/texts.csv --to_db classifier.db
+
+每个工作进程启动时加载一次 jieba 词典和模型（编译为紧凑的推理结构），之后只接收文本块。
+同时在途的块数有上限，结果按输入顺序逐块写出，内存占用与文件大小无关。
+输出保留输入的全部字段，另加 category、sub_categories、confidence、entropy（同名的输入字段被覆盖）；
+--to_db 时结果批量写入 classifications 表。空文本不分类，结果字段留空，也不写入数据库。
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .data_processor import DataProcessor
+
+# 每块的行数
+CHUNK_SIZE = 2000
+# 每个工作进程最多同时在途的块数
+CHUNKS_PER_WORKER = 2
+# 每处理这么多行输出一次进度
+PROGRESS_EVERY = 100000
+
+RESULT_FIELDS = ['category', 'sub_categories', 'confidence', 'entropy']
+
+# 工作进程内的预处理器和模型，由 _init_worker 创建
+_worker_processor = None
+_worker_model = None
+
+
+def _init_worker(model_dir, version, prune):
+    global _worker_processor, _worker_model
+    from .model_registry import ModelRegistry
+    from .startup import preload_jieba
+
+    preload_jieba()
+    _worker_processor = DataProcessor()
+    _worker_model = ModelRegistry(model_dir, compiled=True, prune=prune).load(version)
+
+
+def _classify_chunk(texts):
+    """预处理并预测一块文本；块内重复的文本只预测一次，空文本的结果为 None"""
+    processed = _worker_processor.preprocess_many(texts)
+    unique_texts = list(dict.fromkeys(text for text in processed if text))
+    predictions = dict(zip(unique_texts, _worker_model.predict_many(unique_texts)))
+    results = []
+    for text in processed:
+        prediction = predictions.get(text)
+        if prediction is not None:
+            prediction = {
+                "category": str(prediction['category']),
+                "sub_categories": prediction['sub_categories'],
+                "confidence": float(prediction['confidence']),
+                "entropy": float(prediction['entropy'])
+            }
+        results.append(prediction)
+    return results
+
+
+def detect_format(path, fmt=None):
+    """按参数或扩展名判断文件格式：csv / ndjson"""
+    if fmt is None:
+        fmt = 'ndjson' if path.lower().endswith(('.ndjson', '.jsonl')) else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"不支持的文件格式: {fmt}")
+    return fmt
+
+
+def iter_chunks(path, fmt, text_field, chunk_size=CHUNK_SIZE):
+    """逐块读取输入，产出 (字段名列表, 记录列表)；CSV 的字段名取表头，NDJSON 取首条记录的键"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            records = reader
+        else:
+            fieldnames = None
+            records = (json.loads(line) for line in f if line.strip())
+
+        chunk = []
+        for record in records:
+            if fieldnames is None:
+                fieldnames = list(record)
+            if text_field not in record:
+                raise ValueError(f"输入记录缺少文本字段: {text_field}")
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield fieldnames, chunk
+                chunk = []
+        if chunk:
+            yield fieldnames, chunk
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = None
+
+    def write(self, fieldnames, records, results):
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.file,
+                fieldnames=list(fieldnames) + [f for f in RESULT_FIELDS if f not in fieldnames],
+                extrasaction='ignore'
+            )
+            self.writer.writeheader()
+        for record, result in zip(records, results):
+            row = dict(record)
+            if result is not None:
+                row.update(result)
+                row['sub_categories'] = json.dumps(result['sub_categories'], ensure_ascii=False)
+            self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class NdjsonSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, fieldnames, records, results):
+        lines = []
+        for record, result in zip(records, results):
+            row = dict(record)
+            row.update(result or dict.fromkeys(RESULT_FIELDS))
+            lines.append(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.write(''.join(lines))
+
+    def close(self):
+        self.file.close()
+
+
+class DatabaseSink:
+    """批量写入 classifications 表：每块一个批次交给写线程，未提交的批次数有上限"""
+
+    def __init__(self, db_path, text_field, max_pending=4):
+        from .database import DatabaseManager
+
+        self.db = DatabaseManager(db_path, flush_rows=CHUNK_SIZE * 2, history_size=0)
+        self.text_field = text_field
+        self.max_pending = max_pending
+        self._pending = deque()
+
+    def write(self, fieldnames, records, results):
+        items = [
+            (record[self.text_field], result)
+            for record, result in zip(records, results)
+            if result is not None
+        ]
+        self._pending.append(self.db.save_classifications(items))
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft().result()
+
+    def close(self):
+        while self._pending:
+            self._pending.popleft().result()
+        self.db.close()
+
+
+def classify_file(input_path, sink, text_field='text', fmt=None, model_dir='models',
+                  version=None, workers=None, chunk_size=CHUNK_SIZE, prune=0.0):
+    """分类整个文件并把结果逐块写入 sink，返回 (总行数, 已分类行数, 秒数)"""
+    from .model_registry import ModelRegistry
+
+    fmt = detect_format(input_path, fmt)
+    workers = workers or os.cpu_count() or 1
+    # 在启动工作进程之前检查，否则模型缺失只会表现为进程池异常退出
+    registry = ModelRegistry(model_dir)
+    model_path = registry.path_for(version or registry.current_version())
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"模型文件不存在: {model_path}")
+    chunks = iter_chunks(input_path, fmt, text_field, chunk_size)
+
+    total = classified = 0
+    next_report = PROGRESS_EVERY
+    start = time.perf_counter()
+
+    def write(fieldnames, records, results):
+        nonlocal total, classified, next_report
+        sink.write(fieldnames, records, results)
+        total += len(records)
+        classified += sum(result is not None for result in results)
+        if total >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"已处理 {total} 行，{total / elapsed:.0f} 行/秒", file=sys.stderr)
+            next_report += PROGRESS_EVERY
+
+    def texts_of(records):
+        return [str(record[text_field] or '') for record in records]
+
+    if workers <= 1:
+        # 单进程时不启动子进程，直接在当前进程中加载模型
+        _init_worker(model_dir, version, prune)
+        for fieldnames, records in chunks:
+            write(fieldnames, records, _classify_chunk(texts_of(records)))
+        return total, classified, time.perf_counter() - start
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(model_dir, version, prune)
+    ) as executor:
+        # 按提交顺序取回结果；在途的块数有上限，读文件的速度不会超过预测的速度
+        in_flight = deque()
+        for fieldnames, records in chunks:
+            in_flight.append((fieldnames, records, executor.submit(_classify_chunk, texts_of(records))))
+            if len(in_flight) >= workers * CHUNKS_PER_WORKER:
+                fieldnames, records, future = in_flight.popleft()
+                write(fieldnames, records, future.result())
+        while in_flight:
+            fieldnames, records, future = in_flight.popleft()
+            write(fieldnames, records, future.result())
+    return total, classified, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', type=str, help='输入文件（.csv / .ndjson / .jsonl）')
+    parser.add_argument('--output', type=str, help='输出文件，格式按扩展名判断')
+    parser.add_argument('--to_db', type=str, help='把结果写入该数据库的 classifications 表')
+    parser.add_argument('--format', type=str, choices=['csv', 'ndjson'], help='输入格式，默认按扩展名判断')
+    parser.add_argument('--text_field', type=str, default='text')
+    parser.add_argument('--model_dir', type=str, default='models')
+    parser.add_argument('--version', type=str, default=None, help='模型版本，默认为当前线上版本')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--prune', type=float, default=0.0, help='编译模型时的剪枝阈值')
+    args = parser.parse_args(argv)
+
+    if bool(args.output) == bool(args.to_db):
+        parser.error("需要且只能指定 --output 或 --to_db 之一")
+
+    if args.to_db:
+        sink = DatabaseSink(args.to_db, args.text_field)
+    elif detect_format(args.output) == 'ndjson':
+        sink = NdjsonSink(args.output)
+    else:
+        sink = CsvSink(args.output)
+
+    try:
+        total, classified, seconds = classify_file(
+            args.input, sink,
+            text_field=args.text_field,
+            fmt=args.format,
+            model_dir=args.model_dir,
+            version=args.version,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            prune=args.prune
+        )
+    finally:
+        sink.close()
+    print(
+        f"完成: {total} 行，分类 {classified} 行，耗时 {seconds:.1f} 秒，"
+        f"{total / seconds if seconds else 0:.0f} 行/秒"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+"""编译后的线性推理结构
+
+把训练好的向量化器和线性模型编译成紧凑的推理结构：
+    词 -> 特征下标的哈希表（哈希向量化时直接计算 murmurhash）、IDF 权重、
+    主模型和子类别判别头堆叠成的一个 float32 系数矩阵（可选剪掉接近 0 的权重）。
+预测时一批文本只做一次稀疏矩阵与稠密矩阵的乘积，绕过 sklearn pipeline 的参数校验和
+逐个模型的调用开销，结果与 sklearn 在 float32 精度内一致。
+
+目录结构（全部为 .npy，不使用 pickle）：
+    compiled.json   向量化参数、概率计算方式、类别和停用词
+    vocabulary.npy  词表（哈希向量化时没有）
+    idf.npy         IDF 权重（哈希向量化时没有）
+    rows.npy        特征下标 -> 系数矩阵的行，-1 表示该特征的权重全部被剪掉
+    weights.npy     float32 系数矩阵 (保留的特征数, 主模型列数 + 子类别判别头数)
+    intercept.npy   对应的截距
+
+导出并与 sklearn 的预测对比：
+    python -m text_classifier.compiled models/classifier models/classifier-compiled [--prune 1e-4]
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from scipy import sparse
+from scipy.special import expit, softmax
+from sklearn.linear_model import LogisticRegression
+from sklearn.utils import murmurhash3_32
+
+from .model_artifact import _linear_state
+
+MANIFEST_NAME = 'compiled.json'
+COMPILED_VERSION = 1
+# 哈希向量化时缓存的 词 -> 特征下标 条目数上限
+HASH_CACHE_SIZE = 500000
+
+
+def _ngrams(tokens, ngram_range):
+    """与 sklearn 向量化器的 _word_ngrams 相同：先是原词，再依次是 2..n 元组合"""
+    min_n, max_n = ngram_range
+    if max_n == 1:
+        return tokens
+    grams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+        for i in range(len(tokens) - n + 1):
+            grams.append(' '.join(tokens[i:i + n]))
+    return grams
+
+
+def _hash_index(token, n_features):
+    """与 HashingVectorizer 相同的特征下标"""
+    h = murmurhash3_32(token, seed=0)
+    if h == -2 ** 31:
+        return (2 ** 31 - 1 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+class CompiledModel:
+    """编译后的主模型和子类别判别头
+
+    vectorizer 为向量化参数（type: tfidf / hashing），proba 为主模型概率的计算方式：
+    softmax（多项逻辑回归）、ovr（一对多 SGD，逐类 sigmoid 后归一化）或 binary。
+    """
+
+    def __init__(self, vectorizer, proba, classes, sub_head_categories, vocabulary, idf,
+                 rows, weights, intercept, n_main, stopwords=()):
+        self.vectorizer = vectorizer
+        self.proba = proba
+        self.classes = np.asarray(classes)
+        self.sub_head_categories = list(sub_head_categories)
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.rows = rows
+        self.weights = weights
+        self.intercept = intercept
+        self.n_main = n_main
+        self.stopwords = list(stopwords)
+        self.ngram_range = tuple(vectorizer['ngram_range'])
+        self._hash_cache = {}
+
+    @classmethod
+    def from_classifier(cls, classifier, prune=0.0):
+        """编译已训练的 LightweightClassifier；prune > 0 时剪掉绝对值小于它的权重"""
+        if classifier.sub_classifiers:
+            raise ValueError("旧版逐子类别模型不支持编译，请重新训练")
+        if classifier.sub_head is None:
+            raise ValueError("模型尚未训练")
+
+        vectorizer = classifier.pipeline[0]
+        estimator = classifier.pipeline[-1]
+        if classifier.incremental:
+            params = {
+                'type': 'hashing',
+                'n_features': vectorizer.n_features,
+                'ngram_range': list(vectorizer.ngram_range),
+                'norm': vectorizer.norm,
+            }
+            vocabulary, idf = None, None
+        else:
+            params = {
+                'type': 'tfidf',
+                'ngram_range': list(vectorizer.ngram_range),
+                'sublinear_tf': vectorizer.sublinear_tf,
+                'norm': vectorizer.norm,
+            }
+            vocabulary = dict(vectorizer.vocabulary_)
+            idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+
+        if isinstance(estimator, LogisticRegression):
+            binary_proba = getattr(estimator, 'multi_class', 'auto') == 'multinomial'
+            proba = 'softmax' if len(estimator.classes_) > 2 or binary_proba else 'binary'
+        else:
+            proba = 'ovr' if len(estimator.classes_) > 2 else 'binary'
+
+        # 主模型的各列和每个判别头的一列拼成 (特征数, 列数) 的矩阵
+        columns = [np.asarray(estimator.coef_, dtype=np.float64)]
+        intercepts = [np.asarray(estimator.intercept_, dtype=np.float64)]
+        n_features = columns[0].shape[1]
+        for head in classifier.sub_head.estimators_:
+            coef, intercept = _linear_state(head)
+            columns.append(np.zeros((1, n_features)) if coef is None else np.asarray(coef).reshape(1, -1))
+            intercepts.append(np.asarray(intercept, dtype=np.float64).ravel()[:1])
+        weights = np.vstack(columns).T
+
+        if prune > 0:
+            weights[np.abs(weights) < prune] = 0.0
+        # 只保留还有非零权重的特征行；被剪掉的特征仍参与文本向量的归一化
+        kept = np.flatnonzero(np.any(weights != 0, axis=1))
+        rows = np.full(n_features, -1, dtype=np.int32)
+        rows[kept] = np.arange(len(kept), dtype=np.int32)
+
+        return cls(
+            params, proba, estimator.classes_, classifier.sub_head_categories,
+            vocabulary, idf, rows,
+            np.ascontiguousarray(weights[kept], dtype=np.float32),
+            np.concatenate(intercepts).astype(np.float32),
+            columns[0].shape[0],
+            sorted(classifier.tokenizer.stopwords)
+        )
+
+    def _feature_index(self, token):
+        if self.vocabulary is not None:
+            return self.vocabulary.get(token)
+        # 哈希向量化没有词表，计算过的下标缓存起来，超过上限时整体清空
+        index = self._hash_cache.get(token)
+        if index is None:
+            if len(self._hash_cache) >= HASH_CACHE_SIZE:
+                self._hash_cache.clear()
+            index = self._hash_cache[token] = _hash_index(token, self.vectorizer['n_features'])
+        return index
+
+    def features(self, token_lists):
+        """分好词的文本 -> 只含保留特征的 CSR 矩阵
+
+        逐条文本只在 Python 中统计词频，TF-IDF 加权、归一化和剪枝对整批一次完成。
+        """
+        feature_index = self._feature_index
+        ngram_range = self.ngram_range
+        indices = []
+        counts = []
+        lengths = []
+        for tokens in token_lists:
+            row = {}
+            for gram in _ngrams(tokens, ngram_range):
+                index = feature_index(gram)
+                if index is not None:
+                    row[index] = row.get(index, 0) + 1
+            indices.extend(row)
+            counts.extend(row.values())
+            lengths.append(len(row))
+
+        n_samples = len(token_lists)
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(counts, dtype=np.float64)
+        row_ids = np.repeat(np.arange(n_samples), lengths)
+        if self.idf is not None:
+            if self.vectorizer['sublinear_tf']:
+                values = np.log(values) + 1
+            values = values * self.idf[indices]
+
+        norm = self.vectorizer['norm']
+        if norm in ('l1', 'l2') and len(values):
+            if norm == 'l2':
+                norms = np.sqrt(np.bincount(row_ids, values * values, minlength=n_samples))
+            else:
+                norms = np.bincount(row_ids, np.abs(values), minlength=n_samples)
+            values = values / norms[row_ids]
+
+        # 被剪掉的特征只参与上面的归一化，不进入矩阵
+        rows = self.rows[indices]
+        kept = rows >= 0
+        indptr = np.zeros(n_samples + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ids[kept], minlength=n_samples), out=indptr[1:])
+        return sparse.csr_matrix(
+            (values[kept].astype(np.float32), rows[kept], indptr),
+            shape=(n_samples, self.weights.shape[0])
+        )
+
+    def scores(self, features):
+        """一次稀疏乘稠密得到所有列的决策值，返回 (主模型决策值, 判别头决策值)"""
+        scores = np.asarray(features @ self.weights) + self.intercept
+        return scores[:, :self.n_main], scores[:, self.n_main:]
+
+    def predict_proba(self, decision):
+        """主模型决策值 -> 类别概率，与对应 sklearn 模型的 predict_proba 一致"""
+        if self.proba == 'softmax':
+            if decision.shape[1] == 1:
+                decision = np.hstack([-decision, decision])
+            return softmax(decision, axis=1)
+        prob = expit(decision)
+        if self.proba == 'binary':
+            return np.hstack([1 - prob, prob])
+        return prob / prob.sum(axis=1, keepdims=True)
+
+    @property
+    def nbytes(self):
+        """数组部分的内存占用（不含词表字典）"""
+        arrays = [self.rows, self.weights, self.intercept]
+        if self.idf is not None:
+            arrays.append(self.idf)
+        return sum(array.nbytes for array in arrays)
+
+    def save(self, path):
+        tmp_path = f'{path.rstrip(os.sep)}.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        manifest = {
+            'compiled_version': COMPILED_VERSION,
+            'vectorizer': self.vectorizer,
+            'proba': self.proba,
+            'classes': self.classes.tolist(),
+            'sub_head_categories': self.sub_head_categories,
+            'n_main': self.n_main,
+            'stopwords': self.stopwords,
+        }
+        arrays = {'rows': self.rows, 'weights': self.weights, 'intercept': self.intercept}
+        if self.vocabulary is not None:
+            arrays['vocabulary'] = np.array(
+                sorted(self.vocabulary, key=self.vocabulary.get), dtype=str
+            )
+            arrays['idf'] = self.idf
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f'{name}.npy'), array, allow_pickle=False)
+        with open(os.path.join(tmp_path, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+            os.rmdir(path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('compiled_version', 0) > COMPILED_VERSION:
+            raise ValueError(f"编译模型版本 {manifest['compiled_version']} 高于当前支持的版本")
+
+        def load_array(name):
+            return np.load(os.path.join(path, f'{name}.npy'), allow_pickle=False)
+
+        vocabulary, idf = None, None
+        if manifest['vectorizer']['type'] == 'tfidf':
+            vocabulary = {token: i for i, token in enumerate(load_array('vocabulary').tolist())}
+            idf = load_array('idf')
+        return cls(
+            manifest['vectorizer'], manifest['proba'], manifest['classes'],
+            manifest['sub_head_categories'], vocabulary, idf,
+            load_array('rows'), load_array('weights'), load_array('intercept'),
+            manifest['n_main'], manifest.get('stopwords', ())
+        )
+
+
+def compare_with_sklearn(classifier, compiled, texts):
+    """同一批文本上编译模型与 sklearn 的差异：主类别概率最大误差、主类别和判别头结果不一致的条数"""
+    tokens = classifier.tokenize_many(texts)
+    features = classifier.pipeline[0].transform(tokens)
+    expected_proba = classifier.pipeline[-1].predict_proba(features)
+    expected_heads = np.asarray(classifier.sub_head.decision_function(features)).reshape(len(texts), -1) > 0
+
+    decision, heads = compiled.scores(compiled.features(tokens))
+    proba = compiled.predict_proba(decision)
+    return {
+        "texts": len(texts),
+        "max_proba_error": float(np.max(np.abs(proba - expected_proba))) if len(texts) else 0.0,
+        "category_mismatches": int(np.sum(proba.argmax(axis=1) != expected_proba.argmax(axis=1))),
+        "sub_head_mismatches": int(np.sum(np.any((heads > 0) != expected_heads, axis=1))),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('model_path', help='训练好的模型目录或 .pkl 文件')
+    parser.add_argument('output_path', help='编译模型的输出目录')
+    parser.add_argument('--prune', type=float, default=0.0, help='剪掉绝对值小于该值的权重')
+    parser.add_argument('--check_data', type=str, default='data/train.csv',
+                        help='与 sklearn 预测对比用的数据（CSV，含 text 列）')
+    args = parser.parse_args()
+
+    from .data_processor import DataProcessor
+    from .models import LightweightClassifier
+
+    model = LightweightClassifier()
+    model.load(args.model_path)
+    compiled = CompiledModel.from_classifier(model, args.prune)
+    compiled.save(args.output_path)
+    print(f"编译模型已保存到: {args.output_path}")
+    print(f"保留特征 {compiled.weights.shape[0]} / {len(compiled.rows)}，数组占用 {compiled.nbytes / 1024:.1f} KB")
+
+    if os.path.exists(args.check_data):
+        processor = DataProcessor()
+        texts, _ = processor.load_data(args.check_data)
+        texts = processor.preprocess_many(texts)
+        report = compare_with_sklearn(model, compiled, texts)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if report['category_mismatches'] or report['sub_head_mismatches']:
+            sys.exit(1)
@@ -1,10 +1,30 @@
-import pandas as pd
 import json
-from sklearn.model_selection import train_test_split
+import re
+
+# 预处理时保留的字符范围（闭区间），其余字符（空白除外）全部删除
+CJK_UNIFIED = ('\u4e00', '\u9fff')
+CJK_EXTENSION_A = ('\u3400', '\u4dbf')
+CJK_EXTENSION_B_TO_F = ('\U00020000', '\U0002ebef')
+CJK_COMPATIBILITY = ('\uf900', '\ufaff')
+FULLWIDTH_DIGITS = ('\uff10', '\uff19')
+ASCII_DIGITS = ('0', '9')
+
+# 默认只保留基本汉字，与训练现有模型时的预处理一致
+DEFAULT_KEEP_RANGES = (CJK_UNIFIED,)
+
+
+def _compile_drop_pattern(keep_ranges):
+    """编译删除模式：匹配连续的、既不在保留范围内也不是空白的字符"""
+    ranges = ''.join(f'{re.escape(start)}-{re.escape(end)}' for start, end in keep_ranges)
+    return re.compile(f'[^{ranges}\\s]+')
+
 
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, keep_ranges=DEFAULT_KEEP_RANGES):
         self.stopwords = self._load_stopwords()
+        # 预编译的正则替代逐字符判断，整段删除在 C 层完成
+        self.keep_ranges = tuple(keep_ranges)
+        self._drop_pattern = _compile_drop_pattern(self.keep_ranges)
     
     def _load_stopwords(self):
         # 加载停用词表
@@ -16,6 +36,8 @@ class DataProcessor:
     
     def load_data(self, file_path):
         """加载训练数据"""
+        # pandas 导入较慢，只在训练时需要
+        import pandas as pd
         df = pd.read_csv(file_path)
         texts = df['text'].tolist()
         labels = df['category'].tolist()
@@ -24,10 +46,14 @@ class DataProcessor:
     def preprocess_text(self, text):
         """文本预处理"""
         # 去除特殊字符
-        text = ''.join([char for char in text if '\u4e00' <= char <= '\u9fff' or char.isspace()])
+        text = self._drop_pattern.sub('', text)
         # 去除多余空格
-        text = ' '.join(text.split())
-        return text
+        return ' '.join(text.split())
+    
+    def preprocess_many(self, texts):
+        """批量预处理，结果与逐条调用 preprocess_text 相同"""
+        drop = self._drop_pattern.sub
+        return [' '.join(drop('', text).split()) for text in texts]
     
     def augment_data(self, texts, labels):
         """数据增强"""
@@ -1,8 +1,121 @@
+import base64
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+from .metrics import DB_BATCH_ROWS, observe_stage
+from .migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+
+def utc_timestamp():
+    """与 SQLite CURRENT_TIMESTAMP 相同格式的 UTC 时间"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+CLASSIFICATION_COLUMNS = ['id', 'text', 'main_category', 'sub_categories',
+                          'confidence', 'timestamp']
+
+
+def classification_row_to_dict(row):
+    """把 classifications 表的一行转换为接口返回的字典"""
+    item = dict(zip(CLASSIFICATION_COLUMNS, row))
+    try:
+        item['sub_categories'] = json.loads(item['sub_categories'])
+    except (TypeError, ValueError):
+        item['sub_categories'] = []
+    return item
+
+
+def uncertainty_score(result):
+    """主动学习排序用的不确定度：低置信度和高预测熵都会使分数升高"""
+    return max(1.0 - float(result["confidence"]), float(result.get("entropy", 0.0)))
+
+
+def encode_page_cursor(timestamp, row_id):
+    """把 (timestamp, id) 编码为不透明的分页游标"""
+    raw = json.dumps([timestamp, row_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_page_cursor(cursor):
+    """解析分页游标，格式不正确时抛出 ValueError"""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("无效的分页游标")
+    return str(timestamp), int(row_id)
+
+
+class RecentHistory:
+    """最近分类记录的内存环形缓冲区
+
+    由写线程在提交后追加，启动时从数据库预热。只包含本进程写入的记录，
+    多进程部署时各进程看到的是自己处理的最近记录。
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._items = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def extend(self, records):
+        """追加按ID递增排列的记录"""
+        with self._lock:
+            self._items.extend(records)
+
+    def latest(self, limit):
+        """最新的 limit 条记录（新的在前），超出缓冲区容量时返回 None"""
+        if limit > self.capacity:
+            return None
+        with self._lock:
+            items = list(self._items)
+        return [dict(item) for item in reversed(items[-limit:])] if limit > 0 else []
+
+
 class DatabaseManager:
-    def __init__(self, db_path="classifier.db"):
-        self.conn = sqlite3.connect(db_path)
+    """SQLite 存储层
+
+    每个线程使用自己的连接，数据库以 WAL 模式运行，读写互不阻塞；
+    分类记录通过后台写线程攒批提交，多条记录共用一次 fsync。
+    """
+
+    def __init__(self, db_path="classifier.db", flush_interval=0.005, flush_rows=500,
+                 history_size=100):
+        self.db_path = db_path
+        self._local = threading.local()
         self.create_tables()
-        
+        self.recent = RecentHistory(history_size)
+        self._warm_recent()
+        self.writer = ClassificationWriter(self, flush_interval, flush_rows)
+
+    def connect(self):
+        """新建一个连接并设置 WAL 模式"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 已能保证数据库一致性，只在检查点时 fsync
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def conn(self):
+        """当前线程专用的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+        return conn
+
+    def cursor(self):
+        """当前线程连接上的新游标，不同请求不再共用同一个游标"""
+        return self.conn.cursor()
+
     def create_tables(self):
         self.conn.execute("""
         CREATE TABLE IF NOT EXISTS classifications (
@@ -14,26 +127,305 @@ class DatabaseManager:
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
         """)
-        self.conn.commit()
-        
-    def save_classification(self, text, result):
         self.conn.execute("""
-        INSERT INTO classifications 
-        (text, main_category, sub_categories, confidence, timestamp)
-        VALUES (?, ?, ?, ?, ?)
-        """, (
-            text,
-            result["category"],
-            json.dumps(result["sub_categories"]),
-            result["confidence"],
-            datetime.now()
-        ))
+        CREATE TABLE IF NOT EXISTS annotations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            main_category TEXT NOT NULL,
+            sub_categories TEXT NOT NULL,
+            source TEXT NOT NULL,  -- 'human' 或 'model'
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
         self.conn.commit()
-        
+        migrate(self.conn)
+
+    def save_classification(self, text, result):
+        """提交一条分类记录，返回在提交完成后得到记录的 Future"""
+        return self.save_classifications([(text, result)])
+
+    def save_classifications(self, items):
+        """提交多条 (text, result) 分类记录
+
+        返回 concurrent.futures.Future，事务提交后结果为写入的记录列表，
+        每条包含 id 和 timestamp。
+        """
+        timestamp = utc_timestamp()
+        rows = [
+            (
+                text,
+                result["category"],
+                json.dumps(result["sub_categories"]),
+                result["confidence"],
+                uncertainty_score(result),
+                timestamp
+            )
+            for text, result in items
+        ]
+        return self.writer.submit(rows)
+
     def get_classifications(self, limit=100):
+        """按ID倒序读取最近的分类记录，直接走主键，不需要排序"""
         cursor = self.conn.execute("""
-        SELECT * FROM classifications 
-        ORDER BY timestamp DESC 
+        SELECT id, text, main_category, sub_categories, confidence, timestamp
+        FROM classifications
+        ORDER BY id DESC
         LIMIT ?
         """, (limit,))
-        return cursor.fetchall() 
\ No newline at end of file
+        return cursor.fetchall()
+
+    def recent_classifications(self, limit=10):
+        """最近的分类记录：优先从内存缓冲区读取，超出容量时查询数据库"""
+        records = self.recent.latest(limit)
+        if records is None:
+            records = [classification_row_to_dict(row) for row in self.get_classifications(limit)]
+        return records
+
+    def uncertainty_queue(self, limit=20):
+        """待标注队列：按不确定度从高到低取尚未人工标注的文本
+
+        annotation_queue 每个文本只有一行（保留不确定度最高的分类记录），
+        按 idx_annotation_queue_uncertainty 顺序取前 limit 行，代价与表大小无关。
+        """
+        rows = self.conn.execute("""
+        SELECT c.id, c.text, c.main_category, c.sub_categories, c.confidence, c.timestamp,
+               q.uncertainty
+        FROM annotation_queue q
+        JOIN classifications c ON c.id = q.classification_id
+        ORDER BY q.uncertainty DESC, q.classification_id
+        LIMIT ?
+        """, (limit,)).fetchall()
+        items = []
+        for row in rows:
+            item = classification_row_to_dict(row[:-1])
+            item['uncertainty'] = row[-1]
+            items.append(item)
+        return items
+
+    def mark_annotated(self, texts):
+        """把这些文本的分类记录移出待标注队列，在调用方的事务中执行"""
+        params = [(text,) for text in texts]
+        self.conn.executemany("""
+        UPDATE classifications SET annotated = 1
+        WHERE text = ? AND annotated = 0
+        """, params)
+        self.conn.executemany("DELETE FROM annotation_queue WHERE text = ?", params)
+
+    def get_annotation_page(self, limit=50, cursor=None, category=None):
+        """按 (timestamp, id) 倒序做键集分页读取人工标注
+
+        cursor 为上一页返回的 next_cursor，category 按主类别过滤。
+        返回 (记录列表, next_cursor)，没有更多数据时 next_cursor 为 None。
+        """
+        conditions = ["source = 'human'"]
+        params = []
+        if category:
+            conditions.append("main_category = ?")
+            params.append(category)
+        if cursor:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(decode_page_cursor(cursor))
+
+        rows = self.conn.execute(f"""
+        SELECT id, text, main_category, sub_categories, timestamp
+        FROM annotations
+        WHERE {' AND '.join(conditions)}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+
+        columns = ['id', 'text', 'main_category', 'sub_categories', 'timestamp']
+        items = []
+        for row in rows[:limit]:
+            item = dict(zip(columns, row))
+            item['sub_categories'] = json.loads(item['sub_categories'])
+            items.append(item)
+
+        next_cursor = None
+        if len(rows) > limit and items:
+            next_cursor = encode_page_cursor(items[-1]['timestamp'], items[-1]['id'])
+        return items, next_cursor
+
+    def annotation_distribution(self):
+        """各主类别的人工标注数量，一次分组查询，走 (source, main_category) 覆盖索引"""
+        return dict(self.conn.execute("""
+        SELECT main_category, COUNT(*)
+        FROM annotations
+        WHERE source = 'human'
+        GROUP BY main_category
+        """).fetchall())
+
+    def existing_annotation_texts(self, texts):
+        """这些文本中已有人工标注的部分，走 idx_annotations_text"""
+        if not texts:
+            return set()
+        placeholders = ', '.join('?' * len(texts))
+        return {row[0] for row in self.conn.execute(f"""
+        SELECT text FROM annotations
+        WHERE source = 'human' AND text IN ({placeholders})
+        """, list(texts))}
+
+    def insert_annotations(self, rows):
+        """在一个事务中批量写入人工标注，rows 为 (text, main_category, sub_categories_json)"""
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany("""
+            INSERT INTO annotations (text, main_category, sub_categories, source)
+            VALUES (?, ?, ?, 'human')
+            """, rows)
+            self.mark_annotated([row[0] for row in rows])
+
+    def iter_annotations(self, page_size=1000, raw=False):
+        """按ID顺序分页遍历全部人工标注，每次产出一页，内存占用与表大小无关
+
+        raw 为 True 时每行为 SELECT * 的完整字段，否则为
+        (id, text, main_category, sub_categories, timestamp)。
+        """
+        columns = '*' if raw else 'id, text, main_category, sub_categories, timestamp'
+        last_id = 0
+        while True:
+            rows = self.conn.execute(f"""
+            SELECT {columns}
+            FROM annotations
+            WHERE source = 'human' AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """, (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _warm_recent(self):
+        rows = self.get_classifications(self.recent.capacity)
+        self.recent.extend(classification_row_to_dict(row) for row in reversed(rows))
+
+    def close(self):
+        self.writer.close()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class ClassificationWriter:
+    """分类记录的后台写线程（group commit）
+
+    请求把记录放进队列后等待 Future；写线程每攒够 flush_rows 行或等待
+    flush_interval 秒就在一个事务中用 executemany 写入并提交一次。
+    """
+
+    def __init__(self, db, flush_interval, flush_rows):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name='classification-writer', daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, rows):
+        future = Future()
+        if not rows:
+            future.set_result([])
+            return future
+        self._queue.put((rows, future))
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            row_count = len(item[0])
+            deadline = time.monotonic() + self.flush_interval
+            while row_count < self.flush_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                row_count += len(item[0])
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        rows = [row for item_rows, _ in batch for row in item_rows]
+        conn = self.db.conn
+        start = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany("""
+                INSERT INTO classifications
+                (text, main_category, sub_categories, confidence, uncertainty, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+                # 同一事务内只有本线程写入，自增ID连续
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                # 已经人工标注过的文本不进入待标注队列；只对本批新记录逐条走
+                # idx_annotations_text 查找，不构造全部人工标注文本的集合
+                conn.execute("""
+                UPDATE classifications SET annotated = 1
+                WHERE id > ? AND EXISTS (
+                    SELECT 1 FROM annotations a
+                    WHERE a.text = classifications.text AND a.source = 'human'
+                )
+                """, (last_id - len(rows),))
+                # 未标注的文本进入待标注队列，同一文本只保留不确定度最高的记录
+                conn.execute("""
+                INSERT INTO annotation_queue (text, classification_id, uncertainty)
+                SELECT text, id, uncertainty
+                FROM classifications
+                WHERE id > ? AND annotated = 0
+                ON CONFLICT (text) DO UPDATE SET
+                    classification_id = excluded.classification_id,
+                    uncertainty = excluded.uncertainty
+                WHERE excluded.uncertainty > annotation_queue.uncertainty
+                """, (last_id - len(rows),))
+        except Exception as e:
+            logger.exception("写入分类记录失败", extra={"rows": len(rows)})
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        # 事务（含提交）耗时和每批行数
+        observe_stage('db_commit', time.perf_counter() - start)
+        DB_BATCH_ROWS.observe(len(rows))
+
+        next_id = last_id - len(rows) + 1
+        saved = []
+        for item_rows, future in batch:
+            records = []
+            for text, category, sub_categories, confidence, _, timestamp in item_rows:
+                records.append({
+                    "id": next_id,
+                    "text": text,
+                    "main_category": category,
+                    "sub_categories": json.loads(sub_categories),
+                    "confidence": confidence,
+                    "timestamp": timestamp
+                })
+                next_id += 1
+            saved.extend(records)
+            future.set_result(records)
+
+        self.db.recent.extend(saved)
+
+    def close(self):
+        """写完队列中剩余的记录后停止写线程"""
+        self._queue.put(None)
+        self._thread.join()
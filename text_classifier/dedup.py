@@ -0,0 +1,207 @@
+"""近重复文本检测：在 jieba 分词结果上做 MinHash-LSH
+
+每条文本取分词后的词集合（已过滤单字和停用词，与模型看到的词一致），计算 NUM_PERM 个
+MinHash 值作为签名；签名切成若干段，每段作为一个 LSH 桶的键。查询只比较至少有一段
+完全相同的候选，再用签名中相同位置的比例估计 Jaccard 相似度，达到阈值即视为近重复。
+插入和查询都只访问少数几个桶，耗时与索引大小基本无关。
+
+用于训练集去重（只合并标签相同的文本），以及在线分类时复用近似文本的预测结果。
+分词会过滤"不""没"这样的单字，含义相反的两条文本可能得到相同的签名，因此不用于导入去重。
+"""
+import functools
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# 默认的 Jaccard 相似度阈值
+DEFAULT_THRESHOLD = 0.9
+# 签名长度（MinHash 个数）
+NUM_PERM = 64
+# 哈希排列 (a * h + b) mod p 使用的素数，h 为 32 位，乘积不会超出 uint64
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+
+NearDuplicate = namedtuple('NearDuplicate', ['key', 'value', 'similarity'])
+
+
+@functools.lru_cache(maxsize=200000)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def text_key(text):
+    """文本的 8 字节摘要，作为索引中的键"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+
+def minhash(tokens):
+    """词集合的 MinHash 签名（uint32 数组），没有词时返回 None"""
+    unique = set(tokens)
+    if not unique:
+        return None
+    hashes = np.fromiter((_token_hash(token) for token in unique), dtype=np.uint64, count=len(unique))
+    return ((_PERM_A * hashes + _PERM_B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    """选择 (段数, 每段行数)：在 S 曲线拐点 (1/段数)^(1/行数) 不超过阈值的方案中取行数最多的，
+    即在保证召回的前提下候选最少"""
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """可增量插入的近重复索引，线程安全
+
+    tokenizer 为 tokenizer.Tokenizer；每条文本可以附带一个值（例如预测结果）。
+    capacity 限制条目数，超出时淘汰最早插入的条目；为 None 时不限制。
+    没有有效词的文本不进入 LSH 桶，只能按原文精确匹配。
+    """
+
+    def __init__(self, tokenizer, threshold=DEFAULT_THRESHOLD, capacity=None):
+        self.tokenizer = tokenizer
+        self.threshold = threshold
+        self.capacity = capacity
+        self.bands, self.rows = lsh_bands(threshold)
+        self._items = OrderedDict()  # key -> (签名, 值)
+        self._buckets = [{} for _ in range(self.bands)]  # 每段: 段内容 -> 键集合
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.collapsed = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def signature(self, text):
+        """文本的签名；已在索引中的文本直接取存下的签名，不再分词"""
+        entry = self._items.get(text_key(text))
+        if entry is not None:
+            return entry[0]
+        return minhash(self.tokenizer.tokenize(text))
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows].tobytes() for i in range(self.bands)]
+
+    def _find(self, key, signature):
+        entry = self._items.get(key)
+        if entry is not None:
+            return NearDuplicate(key, entry[1], 1.0)
+        if signature is None:
+            return None
+
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        if not candidates:
+            return None
+
+        # 所有候选的签名一次比较，估计的相似度为相同位置的比例
+        candidates = list(candidates)
+        signatures = np.stack([self._items[candidate][0] for candidate in candidates])
+        similarities = (signatures == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        key = candidates[best]
+        return NearDuplicate(key, self._items[key][1], float(similarities[best]))
+
+    def _add(self, key, signature, value):
+        if key in self._items:
+            self._items[key] = (self._items[key][0], value)
+            return
+        self._items[key] = (signature, value)
+        if signature is not None:
+            for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(band_key, set()).add(key)
+        if self.capacity is not None and len(self._items) > self.capacity:
+            self._remove(next(iter(self._items)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        signature, _ = self._items.pop(key)
+        if signature is None:
+            return
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            keys = bucket.get(band_key)
+            keys.discard(key)
+            if not keys:
+                del bucket[band_key]
+
+    def find(self, text, signature=None):
+        """查找最相似的近重复条目，返回 NearDuplicate(key, value, similarity) 或 None"""
+        if signature is None:
+            signature = self.signature(text)
+        with self._lock:
+            self.lookups += 1
+            match = self._find(text_key(text), signature)
+            if match is not None:
+                self.collapsed += 1
+            return match
+
+    def add(self, text, value=None, signature=None):
+        if signature is None:
+            signature = self.signature(text)
+        with self._lock:
+            self._add(text_key(text), signature, value)
+
+    def add_if_new(self, text, value=None, signature=None):
+        """没有近重复条目时插入并返回 None，否则不插入，返回已有的条目"""
+        if signature is None:
+            signature = self.signature(text)
+        key = text_key(text)
+        with self._lock:
+            self.lookups += 1
+            match = self._find(key, signature)
+            if match is not None:
+                self.collapsed += 1
+                return match
+            self._add(key, signature, value)
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def stats(self):
+        return {
+            "items": len(self._items),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "collapsed": self.collapsed,
+            "collapse_rate": self.collapsed / self.lookups if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+def dedupe(texts, labels, tokenizer, threshold=DEFAULT_THRESHOLD, keep='last'):
+    """训练集去重，返回保留的下标（升序）
+
+    只合并标签相同的近重复文本，标签不同的文本即使相似度为 1 也都保留。
+    keep='last' 时近重复的一组文本保留最后一条（通常是最新、修正过的标注）。
+    """
+    indexes = {}
+    order = range(len(texts) - 1, -1, -1) if keep == 'last' else range(len(texts))
+    kept = []
+    for i in order:
+        index = indexes.get(labels[i])
+        if index is None:
+            index = indexes[labels[i]] = NearDuplicateIndex(tokenizer, threshold)
+        if index.add_if_new(texts[i]) is None:
+            kept.append(i)
+    kept.sort()
+    return kept
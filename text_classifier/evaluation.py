@@ -0,0 +1,113 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score,
+    confusion_matrix,
+    f1_score,
+    precision_recall_fscore_support
+)
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from .models import LightweightClassifier
+
+# 测试集超过该条数时才按进程分片预测，数据量小时进程启动开销更大
+MIN_SHARD_SIZE = 5000
+# 置信度校准的分箱数
+CALIBRATION_BINS = 10
+
+# 子进程内缓存已加载的模型，每个进程只加载一次
+_worker_models = {}
+
+
+def _predict_shard(model_path, texts):
+    classifier = _worker_models.get(model_path)
+    if classifier is None:
+        classifier = LightweightClassifier()
+        classifier.load(model_path)
+        _worker_models[model_path] = classifier
+    return classifier.predict_many(texts)
+
+
+def predict_sharded(classifier, texts, model_path=None, n_jobs=1):
+    """批量预测；n_jobs > 1 且数据量足够大时按进程分片，每个进程从 model_path 加载模型"""
+    if n_jobs <= 1 or model_path is None or len(texts) < MIN_SHARD_SIZE:
+        return classifier.predict_many(texts)
+
+    shard_size = (len(texts) + n_jobs - 1) // n_jobs
+    shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        results = executor.map(_predict_shard, [model_path] * len(shards), shards)
+        return [prediction for shard in results for prediction in shard]
+
+
+def calibration_report(confidences, correct, n_bins=CALIBRATION_BINS):
+    """按置信度分箱，比较平均置信度与实际准确率，并计算期望校准误差（ECE）"""
+    confidences = np.asarray(confidences, dtype=float)
+    correct = np.asarray(correct, dtype=float)
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    bin_ids = np.clip(np.digitize(confidences, edges[1:-1]), 0, n_bins - 1)
+
+    bins = []
+    ece = 0.0
+    for b in range(n_bins):
+        mask = bin_ids == b
+        count = int(mask.sum())
+        if count == 0:
+            continue
+        mean_confidence = float(confidences[mask].mean())
+        accuracy = float(correct[mask].mean())
+        ece += count / len(confidences) * abs(accuracy - mean_confidence)
+        bins.append({
+            "range": [float(edges[b]), float(edges[b + 1])],
+            "count": count,
+            "mean_confidence": mean_confidence,
+            "accuracy": accuracy
+        })
+    return {"ece": float(ece), "bins": bins}
+
+
+def evaluate_predictions(predictions, true_categories, true_sub_categories):
+    """根据整批预测结果计算完整的评估指标"""
+    pred_categories = [p["category"] for p in predictions]
+    labels = sorted(set(true_categories) | set(pred_categories))
+
+    precision, recall, f1, support = precision_recall_fscore_support(
+        true_categories, pred_categories, labels=labels, zero_division=0
+    )
+    per_class = {
+        label: {
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1": float(f1[i]),
+            "support": int(support[i])
+        }
+        for i, label in enumerate(labels)
+    }
+
+    # 子类别按多标签问题评估
+    binarizer = MultiLabelBinarizer()
+    binarizer.fit(list(true_sub_categories) + [p["sub_categories"] for p in predictions])
+    y_true_sub = binarizer.transform(true_sub_categories)
+    y_pred_sub = binarizer.transform([p["sub_categories"] for p in predictions])
+
+    correct = [t == p for t, p in zip(true_categories, pred_categories)]
+    return {
+        "count": len(predictions),
+        "accuracy": float(accuracy_score(true_categories, pred_categories)),
+        "macro_f1": float(f1_score(true_categories, pred_categories, average='macro', zero_division=0)),
+        "per_class": per_class,
+        "confusion_matrix": {
+            "labels": labels,
+            "matrix": confusion_matrix(true_categories, pred_categories, labels=labels).tolist()
+        },
+        "sub_categories": {
+            "micro_f1": float(f1_score(y_true_sub, y_pred_sub, average='micro', zero_division=0)),
+            "macro_f1": float(f1_score(y_true_sub, y_pred_sub, average='macro', zero_division=0))
+        },
+        "calibration": calibration_report([p["confidence"] for p in predictions], correct)
+    }
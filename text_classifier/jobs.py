@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def run_training(texts, labels, model_path, last_annotation_id=None,
+                 incremental=False, base_model_path=None, stopwords=(), n_jobs=1,
+                 **train_params):
+    """在子进程中训练新模型并保存到 model_path，返回 (验证分数, 参数搜索结果)
+
+    指定 base_model_path 时加载该模型，只用传入的新增数据做增量更新；
+    否则从头完整训练一个新模型（停用词只在完整训练时生效，增量更新沿用基础模型的停用词）。
+    n_jobs 为并行分词和参数搜索的进程数，train_params 透传给 LightweightClassifier.train。
+    """
+    from .models import LightweightClassifier
+
+    if base_model_path is not None:
+        classifier = LightweightClassifier()
+        classifier.load(base_model_path)
+        classifier.n_jobs = n_jobs
+        val_score = classifier.partial_fit(texts, labels)
+    else:
+        classifier = LightweightClassifier(incremental=incremental, stopwords=stopwords, n_jobs=n_jobs)
+        val_score = classifier.train(texts, labels, **train_params)
+    classifier.last_annotation_id = last_annotation_id
+    classifier.save(model_path)
+    return val_score, classifier.search_results
+
+
+class RetrainJob:
+    """一次后台重训练任务的状态"""
+
+    def __init__(self, config=None):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'  # queued / running / succeeded / failed
+        self.stage = '等待中'
+        self.progress = 0.0
+        self.config = config or {}
+        self.data_count = 0
+        self.val_score = None
+        self.search_results = None
+        self.model_version = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def update(self, stage, progress):
+        self.stage = stage
+        self.progress = progress
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "config": self.config,
+            "data_count": self.data_count,
+            "val_score": self.val_score,
+            "search_results": self.search_results,
+            "model_version": self.model_version,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class RetrainJobManager:
+    """后台重训练任务管理
+
+    训练在独立进程中进行并写入新的版本文件，完成后在线程中加载新模型，
+    再通过 on_model_ready 回调整体替换线上模型，服务不会读到训练到一半的模型。
+    切换后删除旧版本的模型目录，只保留线上版本和最新的 keep_versions 个版本。
+    """
+
+    def __init__(self, registry, on_model_ready, max_history=20, keep_versions=5):
+        self.registry = registry
+        self.on_model_ready = on_model_ready
+        self.max_history = max_history
+        self.keep_versions = keep_versions
+        self.jobs = OrderedDict()
+        self._executor = None
+        # 持有后台任务的引用，防止被垃圾回收
+        self._tasks = set()
+
+    def _get_executor(self):
+        # 使用 spawn 启动训练进程，避免在带有线程池的进程中 fork
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def _reset_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def active_job(self):
+        for job in self.jobs.values():
+            if job.is_active:
+                return job
+        return None
+
+    def create(self, config=None):
+        """登记一个新任务，超出保留数量时丢弃最早的已结束任务"""
+        job = RetrainJob(config)
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.max_history:
+            oldest_id = next(
+                (job_id for job_id, old in self.jobs.items() if not old.is_active),
+                None
+            )
+            if oldest_id is None:
+                break
+            del self.jobs[oldest_id]
+        return job
+
+    def start(self, job, texts, labels, **training_kwargs):
+        """在事件循环中启动后台任务，training_kwargs 透传给 run_training"""
+        job.data_count = len(texts)
+        task = asyncio.create_task(self._run(job, texts, labels, training_kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job, texts, labels, training_kwargs):
+        loop = asyncio.get_running_loop()
+        version = self.registry.new_version()
+        model_path = self.registry.path_for(version)
+        try:
+            job.status = 'running'
+            job.update('训练中', 0.1)
+            job.val_score, job.search_results = await loop.run_in_executor(
+                self._get_executor(),
+                functools.partial(run_training, texts, labels, model_path, **training_kwargs)
+            )
+
+            job.update('加载新模型', 0.8)
+            new_classifier = await asyncio.to_thread(self.registry.load, version)
+
+            job.update('切换线上模型', 0.9)
+            self.registry.promote(version)
+            self.on_model_ready(new_classifier)
+
+            job.model_version = version
+            job.status = 'succeeded'
+            job.update('训练完成', 1.0)
+
+            try:
+                await asyncio.to_thread(self.registry.remove_old_versions, self.keep_versions)
+            except Exception:
+                # 清理失败不影响已经切换的新模型
+                logger.exception("删除旧版本模型失败", extra={"job_id": job.id})
+        except BrokenProcessPool as e:
+            # 训练进程异常退出（OOM、段错误等）后进程池不可再用，丢弃它，下一个任务重新创建
+            logger.exception("训练进程异常退出", extra={"job_id": job.id})
+            self._reset_executor()
+            job.status = 'failed'
+            job.error = f"训练进程异常退出: {e}"
+            job.stage = '训练失败'
+        except Exception as e:
+            logger.exception("训练任务失败", extra={"job_id": job.id})
+            job.status = 'failed'
+            job.error = str(e)
+            job.stage = '训练失败'
+        finally:
+            job.finished_at = datetime.now()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
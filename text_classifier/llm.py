@@ -0,0 +1,228 @@
+"""大模型分类建议
+
+后端可插拔：
+- openai：OpenAI 兼容接口，base_url 可指向远程服务或本地的 llm_stub 服务
+- fake：进程内的确定性假后端，用于测试和离线部署
+"""
+import asyncio
+import logging
+import os
+import time
+
+from .cache import PredictionCache
+from .metrics import observe_stage
+from .workers import WorkerBusyError
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "你是一个专业的文本分类助手，擅长分析文本中的价值观倾向。"
+
+PROMPT_TEMPLATE = """请分析以下文本的价值观倾向，并给出详细解释。
+文本："{text}"
+
+请从以下类别中选择：
+主类别：
+- 正向价值观（包含：爱国、敬业、诚信、友善、和谐、公平、正义）
+- 负向价值观（包含：暴力、歧视、谣言、极端、违法、不当言论）
+- 中性（包含：客观描述、日常交流）
+
+请按照以下格式输出：
+主类别：[类别名]
+子类别：[相关的具体子类别，可多选]
+分析理由：[详细解释为什么属于这个类别]"""
+
+
+def build_prompt(text):
+    return PROMPT_TEMPLATE.format(text=text)
+
+
+def extract_text(prompt):
+    """从 build_prompt 生成的 prompt 中取回待分析的文本"""
+    body = prompt.split('文本："', 1)[-1]
+    return body.split('"\n\n请从以下类别中选择', 1)[0]
+
+
+def parse_suggestion(ai_response):
+    """解析大模型按约定格式输出的主类别、子类别和分析理由"""
+    category = ""
+    sub_categories = []
+    explanation = ""
+
+    for line in ai_response.split('\n'):
+        line = line.strip()
+        if line.startswith('主类别：'):
+            category = line.replace('主类别：', '').strip()
+        elif line.startswith('子类别：'):
+            sub_cats = line.replace('子类别：', '').strip()
+            # 处理可能的不同分隔符
+            if '、' in sub_cats:
+                sub_categories = [cat.strip() for cat in sub_cats.split('、')]
+            elif ',' in sub_cats:
+                sub_categories = [cat.strip() for cat in sub_cats.split(',')]
+            elif '，' in sub_cats:
+                sub_categories = [cat.strip() for cat in sub_cats.split('，')]
+            else:
+                sub_categories = [sub_cats]
+            # 过滤空字符串
+            sub_categories = [cat for cat in sub_categories if cat]
+        elif line.startswith('分析理由：'):
+            explanation = line.replace('分析理由：', '').strip()
+
+    return {
+        "category": category,
+        "sub_categories": sub_categories,
+        "explanation": explanation
+    }
+
+
+class OpenAIBackend:
+    """OpenAI 兼容接口的异步客户端，整个进程共用一个连接池"""
+
+    def __init__(self, base_url, api_key, model="gpt-3.5-turbo", timeout=30.0,
+                 max_connections=16):
+        import httpx
+        from openai import AsyncOpenAI
+
+        self.name = f"openai:{model}"
+        self.model = model
+        self.client = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                timeout=timeout
+            )
+        )
+
+    async def complete(self, prompt):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=500
+        )
+        return response.choices[0].message.content
+
+    async def close(self):
+        await self.client.close()
+
+
+class FakeBackend:
+    """确定性的假后端：按关键词给出固定格式的回答，不访问网络"""
+
+    name = "fake"
+
+    KEYWORDS = {
+        "正向价值观": {
+            "爱国": ["祖国", "国家", "民族", "爱国"],
+            "敬业": ["努力", "认真", "负责", "专注", "工作"],
+            "诚信": ["诚实", "守信", "信用", "承诺"],
+            "友善": ["友好", "善良", "关心", "帮助"],
+            "和谐": ["和谐"],
+            "公平": ["公平", "公正"],
+            "正义": ["正义"]
+        },
+        "负向价值观": {
+            "暴力": ["暴力", "打人", "殴打"],
+            "歧视": ["歧视"],
+            "谣言": ["谣言", "造谣"],
+            "极端": ["极端"],
+            "违法": ["违法", "犯罪"],
+            "不当言论": ["辱骂", "脏话"]
+        }
+    }
+
+    @staticmethod
+    def respond(text):
+        """根据待分析文本生成回答，本地 stub 服务也使用这个函数"""
+        for category, sub_keywords in FakeBackend.KEYWORDS.items():
+            matched = [
+                sub for sub, words in sub_keywords.items()
+                if any(word in text for word in words)
+            ]
+            if matched:
+                return (
+                    f"主类别：{category}\n"
+                    f"子类别：{'、'.join(matched)}\n"
+                    f"分析理由：文本包含与{'、'.join(matched)}相关的表述。"
+                )
+        return "主类别：中性\n子类别：日常交流\n分析理由：文本未体现明显的价值观倾向。"
+
+    async def complete(self, prompt):
+        # 只匹配待分析文本，避免匹配到 prompt 中的类别说明
+        return self.respond(extract_text(prompt))
+
+    async def close(self):
+        pass
+
+
+def create_backend(max_connections=8):
+    """根据环境变量创建后端：CLASSIFIER_LLM_BACKEND=openai（默认）或 fake
+
+    openai 后端的密钥只从 OPENAI_API_KEY 读取；未设置时返回 None（大模型未配置），
+    fake 后端只在显式指定时使用，不会冒充真实的大模型回答。
+    """
+    backend = os.environ.get('CLASSIFIER_LLM_BACKEND', 'openai')
+    if backend == 'fake':
+        return FakeBackend()
+    if backend == 'openai':
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            logger.warning("未设置 OPENAI_API_KEY，大模型建议不可用")
+            return None
+        return OpenAIBackend(
+            base_url=os.environ.get('CLASSIFIER_LLM_BASE_URL', 'https://api.openai-proxy.org/v1'),
+            api_key=api_key,
+            model=os.environ.get('CLASSIFIER_LLM_MODEL', 'gpt-3.5-turbo'),
+            max_connections=max_connections
+        )
+    raise ValueError(f"未知的大模型后端: {backend}")
+
+
+class SuggestionService:
+    """大模型建议服务：限制并发、限制排队深度，并按文本哈希缓存解析后的结果"""
+
+    def __init__(self, backend, max_concurrency=8, max_queue=32,
+                 cache_bytes=8 * 1024 * 1024, cache_ttl=24 * 3600):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.cache = PredictionCache(cache_bytes, cache_ttl)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def suggest(self, text):
+        cached = self.cache.get(self.backend.name, text)
+        if cached is not None:
+            return cached
+
+        if self._pending >= self.max_concurrency + self.max_queue:
+            raise WorkerBusyError("大模型请求队列已满")
+
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                start = time.perf_counter()
+                ai_response = await self.backend.complete(build_prompt(text))
+                observe_stage('llm', time.perf_counter() - start)
+        finally:
+            self._pending -= 1
+
+        suggestion = parse_suggestion(ai_response)
+        suggestion["raw_response"] = ai_response
+        self.cache.put(self.backend.name, text, suggestion)
+        return suggestion
+
+    async def close(self):
+        await self.backend.close()
@@ -0,0 +1,35 @@
+"""本地大模型 stub 服务：OpenAI 兼容的 /v1/chat/completions 接口，返回 FakeBackend 的确定性回答
+
+启动：uvicorn text_classifier.llm_stub:app --port 8001
+使用：CLASSIFIER_LLM_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub 启动主服务
+"""
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+
+from .llm import FakeBackend, extract_text
+
+app = FastAPI()
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    data = await request.json()
+    prompt = next(
+        (m["content"] for m in reversed(data.get("messages", [])) if m.get("role") == "user"),
+        ""
+    )
+    content = FakeBackend.respond(extract_text(prompt))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": data.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
@@ -0,0 +1,60 @@
+"""日志配置
+
+各模块使用 logging.getLogger(__name__)，由服务或命令行入口调用 configure_logging。
+级别由 CLASSIFIER_LOG_LEVEL 控制（默认 INFO），低于该级别的日志在格式化之前就被丢弃；
+CLASSIFIER_LOG_FORMAT=json 时每条日志输出一行 JSON，extra 中的字段一并输出。
+"""
+import json
+import logging
+import os
+
+# LogRecord 自带的属性，其余属性视为 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """可读的文本格式，extra 字段以 key=value 附在消息后"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        fields = ' '.join(
+            f'{key}={value}' for key, value in vars(record).items() if key not in _RECORD_ATTRS
+        )
+        return f'{text} {fields}' if fields else text
+
+
+def configure_logging(level=None, fmt=None):
+    """配置 text_classifier 包的日志输出，重复调用只更新级别和格式"""
+    level = (level or os.environ.get('CLASSIFIER_LOG_LEVEL', 'INFO')).upper()
+    fmt = fmt or os.environ.get('CLASSIFIER_LOG_FORMAT', 'text')
+
+    logger = logging.getLogger('text_classifier')
+    logger.setLevel(level)
+    handler = next((h for h in logger.handlers if getattr(h, '_classifier_handler', False)), None)
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler._classifier_handler = True
+        logger.addHandler(handler)
+        # 不再传给根日志器，避免 uvicorn 等配置的处理器重复输出
+        logger.propagate = False
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    return logger
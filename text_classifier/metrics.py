@@ -0,0 +1,176 @@
+"""进程内指标：延迟直方图和按需计算的仪表，以 Prometheus 文本格式导出
+
+各阶段延迟统一记录在 classifier_stage_seconds{stage="..."} 直方图中：
+preprocess / tokenize / vectorize / main_model / sub_heads / db_write / db_commit / llm。
+记录一次观测只做一次二分查找和加锁计数，开销在微秒级。
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# 延迟直方图的桶上界（秒）
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """带标签的累积直方图"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # 标签值元组 -> [各桶计数..., 总和, 总数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, 'le': _format_value(bound)})
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(values[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {values[-1]}')
+        return lines
+
+
+class Gauge:
+    """导出时才调用 func 取值的仪表；func 返回数值，或 {标签字典元组: 数值} 的多条序列"""
+
+    def __init__(self, name, help_text, func, metric_type='gauge'):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.metric_type = metric_type
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.metric_type}']
+        value = self.func()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            for labels, item in value.items():
+                lines.append(f'{self.name}{_format_labels(dict(labels))} {_format_value(item)}')
+        else:
+            lines.append(f'{self.name} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name, help_text, func, metric_type='gauge'):
+        return self.register(Gauge(name, help_text, func, metric_type))
+
+    def render(self):
+        """Prometheus 文本格式（0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'classifier_stage_seconds', '各处理阶段耗时（秒）', ('stage',)
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'classifier_request_seconds', 'HTTP 请求耗时（秒）', ('method', 'route', 'status')
+))
+DB_BATCH_ROWS = REGISTRY.register(Histogram(
+    'classifier_db_batch_rows', '分类记录写线程每次提交的行数', (),
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+))
+
+
+class RequestMetricsMiddleware:
+    """ASGI 中间件：按方法、路由模板和状态码记录请求耗时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # 路由匹配后 scope 中带有 route，用路径模板而不是实际路径，避免标签爆炸
+            route = scope.get('route')
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope['method'],
+                getattr(route, 'path', 'unmatched'),
+                str(status[0])
+            )
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+
+
+def stage_timer(stage):
+    """with stage_timer('preprocess'): ... 记录代码块耗时"""
+    return STAGE_SECONDS.time(stage)
@@ -0,0 +1,143 @@
+"""数据库结构迁移
+
+每个迁移有一个递增的版本号，已执行到的版本记录在 SQLite 的 user_version 中。
+启动时按顺序执行尚未执行的迁移，每个迁移在单独的事务中完成。
+新增迁移时在 MIGRATIONS 末尾追加，不要修改已发布的迁移。
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, definition):
+    """添加列；列已存在（例如手工加过）时跳过"""
+    if column not in _columns(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _annotation_review_columns(conn):
+    # 审核、标注者和测试集字段，接口中早已使用但建表语句从未创建
+    _add_column(conn, 'annotations', 'review_status', 'TEXT')
+    _add_column(conn, 'annotations', 'reviewer_comments', 'TEXT')
+    _add_column(conn, 'annotations', 'annotator', 'TEXT')
+    _add_column(conn, 'annotations', 'is_test_set', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def _annotation_indexes(conn):
+    # 所有标注查询都按 source 过滤，再按时间排序/按日期或类别分组
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_source_timestamp
+    ON annotations (source, timestamp)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_source_category
+    ON annotations (source, main_category)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_source_date
+    ON annotations (source, DATE(timestamp))
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_source_annotator
+    ON annotations (source, annotator)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_test_set
+    ON annotations (is_test_set, source)
+    """)
+
+
+def _annotation_page_index(conn):
+    # /training-data 按类别过滤后的键集分页
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_source_category_timestamp
+    ON annotations (source, main_category, timestamp)
+    """)
+
+
+def _uncertainty_queue(conn):
+    # 主动学习队列：不确定度越高越靠前，已有人工标注的文本不再进入队列
+    _add_column(conn, 'classifications', 'uncertainty', 'REAL NOT NULL DEFAULT 0')
+    _add_column(conn, 'classifications', 'annotated', 'INTEGER NOT NULL DEFAULT 0')
+    # 旧记录没有预测熵，只能按置信度估算
+    conn.execute("UPDATE classifications SET uncertainty = 1 - confidence")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotations_text
+    ON annotations (text)
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_classifications_text
+    ON classifications (text)
+    """)
+    conn.execute("""
+    UPDATE classifications SET annotated = 1
+    WHERE text IN (SELECT text FROM annotations WHERE source = 'human')
+    """)
+    # 部分索引只包含未标注的记录，取队首是一次 B 树查找
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_classifications_uncertainty
+    ON classifications (uncertainty DESC, id)
+    WHERE annotated = 0
+    """)
+
+
+def _annotation_queue_table(conn):
+    # 待标注队列改为每个文本一行：同一文本被反复提交时只保留不确定度最高的一条记录，
+    # 取队首不再需要跳过重复文本
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS annotation_queue (
+        text TEXT PRIMARY KEY,
+        classification_id INTEGER NOT NULL,
+        uncertainty REAL NOT NULL
+    )
+    """)
+    # SQLite 中与 MAX() 一起选出的裸列取自最大值所在的行
+    conn.execute("""
+    INSERT OR IGNORE INTO annotation_queue (text, classification_id, uncertainty)
+    SELECT text, id, MAX(uncertainty)
+    FROM classifications
+    WHERE annotated = 0
+    GROUP BY text
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_annotation_queue_uncertainty
+    ON annotation_queue (uncertainty DESC, classification_id)
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_classifications_uncertainty")
+
+
+# (版本号, 说明, 迁移函数)
+MIGRATIONS = [
+    (1, '标注表增加审核、标注者和测试集字段', _annotation_review_columns),
+    (2, '标注表常用查询索引', _annotation_indexes),
+    (3, '标注表按类别分页索引', _annotation_page_index),
+    (4, '分类记录不确定度排序队列', _uncertainty_queue),
+    (5, '待标注队列按文本去重', _annotation_queue_table),
+]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """执行所有未执行的迁移，返回执行后的版本号"""
+    version = current_version(conn)
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info("执行数据库迁移 %d: %s", target, description)
+        conn.execute("BEGIN")
+        try:
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = target
+    return version
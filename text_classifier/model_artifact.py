@@ -0,0 +1,215 @@
+"""可内存映射的模型文件格式
+
+模型保存为一个目录：manifest.json 记录格式版本和超参数，词表、IDF 和各线性模型的
+系数矩阵分别保存为 .npy 文件。加载时用 np.load(mmap_mode='c') 映射数组，
+多个 worker 进程通过操作系统页缓存共享同一份数据，冷启动不需要反序列化；
+全程不使用 pickle，加载来源不可信的模型文件也不会执行任意代码。
+
+目录结构：
+    manifest.json      格式标识、版本、向量化器参数、类别、停用词和训练状态
+    vocabulary.npy     TF-IDF 词表，按特征下标排列（哈希向量化时没有）
+    idf.npy            IDF 权重（哈希向量化时没有）
+    classes.npy        主模型的类别
+    coef.npy           主模型系数 (类别数, 特征数)
+    intercept.npy      主模型截距
+    sub_coef.npy       子类别判别头系数，每个主类别一行
+    sub_intercept.npy  子类别判别头截距
+
+旧格式转换：python -m text_classifier.model_artifact models/classifier.pkl models/classifier
+"""
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.preprocessing import LabelBinarizer
+
+ARTIFACT_FORMAT = 'lightweight-classifier'
+# 目录格式版本，结构不兼容地变化时递增
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def _save_array(path, name, array):
+    np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _load_array(path, name):
+    # copy-on-write 映射：只读的页在进程间共享，增量训练写入时才复制
+    return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='c', allow_pickle=False)
+
+
+def _linear_state(estimator):
+    """线性模型的 (coef, intercept)；一对多中某列只有一个取值时 sklearn 会换成常数预测器"""
+    if hasattr(estimator, 'coef_'):
+        return estimator.coef_, estimator.intercept_
+    # 常数预测器的决策值恒为 0 或 1，用零系数加同值截距表示，判别结果（> 0）不变
+    return None, np.array([float(estimator.y_[0])])
+
+
+def save_artifact(classifier, path):
+    """把分类器保存为模型目录：先写到临时目录，完成后整体改名，读者不会看到写了一半的模型"""
+    if classifier.sub_classifiers:
+        raise ValueError("旧版逐子类别模型不支持新格式，请重新训练后再保存")
+    if classifier.sub_head is None:
+        raise ValueError("模型尚未训练")
+
+    vectorizer = classifier.pipeline[0]
+    estimator = classifier.pipeline[-1]
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'artifact_version': ARTIFACT_VERSION,
+        'model_format_version': classifier.FORMAT_VERSION,
+        'incremental': classifier.incremental,
+        'last_annotation_id': classifier.last_annotation_id,
+        'sub_head_categories': list(classifier.sub_head_categories),
+        'stopwords': sorted(classifier.tokenizer.stopwords),
+    }
+
+    tmp_path = f'{path.rstrip(os.sep)}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    if classifier.incremental:
+        manifest['vectorizer'] = {'type': 'hashing', 'n_features': vectorizer.n_features}
+        manifest['t'] = float(estimator.t_)
+    else:
+        vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        # 参数搜索可能改变这些超参数，加载时需要按训练时的值重建
+        manifest['vectorizer'] = {
+            'type': 'tfidf',
+            'params': {
+                'ngram_range': list(vectorizer.ngram_range),
+                'max_features': vectorizer.max_features,
+                'sublinear_tf': vectorizer.sublinear_tf,
+                'norm': vectorizer.norm,
+            }
+        }
+        _save_array(tmp_path, 'vocabulary', np.array(vocabulary, dtype=str))
+        _save_array(tmp_path, 'idf', vectorizer.idf_)
+
+    _save_array(tmp_path, 'classes', np.asarray(estimator.classes_, dtype=str))
+    _save_array(tmp_path, 'coef', estimator.coef_)
+    _save_array(tmp_path, 'intercept', estimator.intercept_)
+
+    # 每个主类别的二元判别头堆叠成一个矩阵
+    n_features = estimator.coef_.shape[1]
+    sub_coef = np.zeros((len(classifier.sub_head.estimators_), n_features))
+    sub_intercept = np.zeros(len(classifier.sub_head.estimators_))
+    for i, head in enumerate(classifier.sub_head.estimators_):
+        coef, intercept = _linear_state(head)
+        if coef is not None:
+            sub_coef[i] = coef.ravel()
+        sub_intercept[i] = intercept[0]
+    if classifier.incremental:
+        manifest['sub_head_t'] = [float(head.t_) for head in classifier.sub_head.estimators_]
+    _save_array(tmp_path, 'sub_coef', sub_coef)
+    _save_array(tmp_path, 'sub_intercept', sub_intercept)
+
+    with open(os.path.join(tmp_path, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def _restore_linear(estimator, coef, intercept, classes, t=None):
+    """把系数写回未拟合的 sklearn 线性模型，使其可以直接预测（SGD 模型还可以继续 partial_fit）"""
+    estimator.classes_ = classes
+    estimator.coef_ = coef
+    estimator.intercept_ = intercept
+    estimator.n_features_in_ = coef.shape[1]
+    if t is not None:
+        estimator.t_ = t
+    return estimator
+
+
+def load_artifact(path, build_pipeline):
+    """读取模型目录，返回与旧版 pickle 内容相同结构的字典
+
+    build_pipeline(incremental) 返回未拟合的 pipeline，超参数与训练时一致，
+    拟合得到的词表、IDF 和系数从 .npy 文件映射后填回。
+    """
+    with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"不是分类器模型目录: {path}")
+    if manifest.get('artifact_version', 0) > ARTIFACT_VERSION:
+        raise ValueError(
+            f"模型目录版本 {manifest['artifact_version']} 高于当前支持的版本 {ARTIFACT_VERSION}"
+        )
+
+    incremental = manifest['incremental']
+    pipeline = build_pipeline(incremental)
+
+    vectorizer = pipeline[0]
+    if manifest['vectorizer']['type'] == 'tfidf':
+        params = dict(manifest['vectorizer'].get('params', {}))
+        if 'ngram_range' in params:
+            params['ngram_range'] = tuple(params['ngram_range'])
+        vectorizer.set_params(**params)
+        vocabulary = _load_array(path, 'vocabulary')
+        vectorizer.vocabulary_ = {token: i for i, token in enumerate(vocabulary.tolist())}
+        vectorizer.idf_ = _load_array(path, 'idf')
+
+    _restore_linear(
+        pipeline[-1],
+        _load_array(path, 'coef'),
+        _load_array(path, 'intercept'),
+        np.load(os.path.join(path, 'classes.npy'), allow_pickle=False),
+        manifest.get('t')
+    )
+
+    sub_coef = _load_array(path, 'sub_coef')
+    sub_intercept = _load_array(path, 'sub_intercept')
+    sub_head_categories = manifest['sub_head_categories']
+    if incremental:
+        sub_head = OneVsRestClassifier(SGDClassifier(loss='log_loss', random_state=42))
+        heads = [
+            _restore_linear(SGDClassifier(loss='log_loss', random_state=42), sub_coef[i:i + 1],
+                            sub_intercept[i:i + 1], np.array([0, 1]), t)
+            for i, t in enumerate(manifest['sub_head_t'])
+        ]
+        # 继续 partial_fit 时需要的类别信息
+        sub_head.classes_ = np.array(sub_head_categories)
+        sub_head.label_binarizer_ = LabelBinarizer(sparse_output=True).fit(sub_head.classes_)
+    else:
+        sub_head = OneVsRestClassifier(LogisticRegression())
+        heads = [
+            _restore_linear(LogisticRegression(), sub_coef[i:i + 1],
+                            sub_intercept[i:i + 1], np.array([0, 1]))
+            for i in range(sub_coef.shape[0])
+        ]
+    sub_head.estimators_ = heads
+    sub_head.n_features_in_ = sub_coef.shape[1]
+
+    return {
+        'format_version': manifest['model_format_version'],
+        'incremental': incremental,
+        'last_annotation_id': manifest.get('last_annotation_id'),
+        'pipeline': pipeline,
+        'sub_head': sub_head,
+        'sub_head_categories': sub_head_categories,
+        'sub_classifiers': {},
+        'stopwords': manifest.get('stopwords', [])
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("用法: python -m text_classifier.model_artifact <旧模型.pkl> <新模型目录>")
+        sys.exit(1)
+
+    from .models import LightweightClassifier
+
+    model = LightweightClassifier()
+    model.load(sys.argv[1])
+    save_artifact(model, sys.argv[2])
+    print(f"模型已转换到: {sys.argv[2]}")
@@ -0,0 +1,104 @@
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """管理 models/ 目录下的版本化模型文件
+
+    每次训练生成一个新版本的模型目录 classifier-<版本号>/（见 model_artifact），
+    CURRENT 文件记录当前线上版本；没有 CURRENT 时使用默认模型：
+    优先 classifier/ 目录，其次是旧的 classifier.pkl。
+    """
+
+    def __init__(self, model_dir='models', default_name='classifier', compiled=False, prune=0.0):
+        self.model_dir = model_dir
+        # 加载后编译为紧凑的推理结构（见 compiled），prune 为剪枝阈值
+        self.compiled = compiled
+        self.prune = prune
+        self.default_artifact_path = os.path.join(model_dir, default_name)
+        self.default_path = f'{self.default_artifact_path}.pkl'
+        self.current_file = os.path.join(model_dir, 'CURRENT')
+
+    def new_version(self):
+        """生成新的版本号：时间戳 + 随机后缀，按字典序即按时间排序"""
+        return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def path_for(self, version):
+        """版本对应的模型路径，未发布版本（None / 'default'）对应默认模型"""
+        if version in (None, 'default'):
+            if os.path.isdir(self.default_artifact_path):
+                return self.default_artifact_path
+            return self.default_path
+        return os.path.join(self.model_dir, f'classifier-{version}')
+
+    def current_version(self):
+        """当前线上版本号，未发布过版本时返回 None"""
+        try:
+            with open(self.current_file, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current_path(self):
+        return self.path_for(self.current_version())
+
+    def promote(self, version):
+        """原子地把 CURRENT 指向新版本"""
+        tmp_path = f'{self.current_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_file)
+
+    def versions(self):
+        """模型目录中所有版本号，从旧到新"""
+        prefix = 'classifier-'
+        try:
+            names = os.listdir(self.model_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[len(prefix):] for name in names
+            if name.startswith(prefix) and os.path.isdir(os.path.join(self.model_dir, name))
+        )
+
+    def remove_old_versions(self, keep):
+        """删除旧版本的模型目录，保留当前线上版本和最新的 keep 个版本，返回删除的版本号"""
+        current = self.current_version()
+        versions = self.versions()
+        retained = set(versions[-keep:]) if keep > 0 else set()
+        removed = []
+        for version in versions:
+            if version == current or version in retained:
+                continue
+            shutil.rmtree(self.path_for(version), ignore_errors=True)
+            removed.append(version)
+        if removed:
+            logger.info("已删除 %d 个旧版本模型: %s", len(removed), ', '.join(removed))
+        return removed
+
+    def load(self, version=None):
+        """加载指定版本（默认当前版本）的模型，模型文件不存在时抛出 FileNotFoundError"""
+        if version is None:
+            version = self.current_version()
+
+        # 模型模块依赖 sklearn 和 jieba，只在真正加载模型时导入
+        from .models import LightweightClassifier
+
+        classifier = LightweightClassifier()
+        # 版本化模型只会是模型目录，不反序列化 pickle
+        classifier.load(self.path_for(version), allow_pickle=version in (None, 'default'))
+        classifier.version = version or 'default'
+        if self.compiled:
+            try:
+                classifier.compile(self.prune)
+            except ValueError as e:
+                # 旧版逐子类别模型无法编译，继续使用 sklearn pipeline 预测
+                logger.warning("模型未编译: %s", e)
+        return classifier
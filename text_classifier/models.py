@@ -1,115 +1,372 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.pipeline import Pipeline
+from sklearn.multiclass import OneVsRestClassifier
 from sklearn.model_selection import train_test_split
-import jieba
 import numpy as np
+import logging
+import os
 import pickle
 import json
+import time
+
+from .model_artifact import is_artifact, load_artifact, save_artifact
+from .tokenizer import Tokenizer
+from .tuning import DEFAULT_CV, search_hyperparameters
+from .metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+
+def _identity(tokens):
+    """向量化器的透传函数：输入已经是分好的词"""
+    return tokens
+
+
+def _build_vectorizer():
+    """构建以词列表为输入的TF-IDF向量化器"""
+    return TfidfVectorizer(
+        tokenizer=_identity,
+        preprocessor=_identity,
+        token_pattern=None,
+        lowercase=False,
+        max_features=5000,
+        ngram_range=(1, 2)
+    )
+
+
+def _build_hashing_vectorizer():
+    """构建无状态的哈希向量化器，增量训练时无需重新拟合词表"""
+    return HashingVectorizer(
+        tokenizer=_identity,
+        preprocessor=_identity,
+        token_pattern=None,
+        lowercase=False,
+        ngram_range=(1, 2),
+        n_features=2 ** 18,
+        alternate_sign=False
+    )
+
+
+def _build_pipeline(incremental=False):
+    """构建未拟合的分类pipeline
+    
+    分词在进入pipeline之前统一完成，向量化器直接接收词列表。
+    增量模式：哈希向量化 + 支持 partial_fit 的线性模型。
+    """
+    if incremental:
+        return Pipeline([
+            ('hashing', _build_hashing_vectorizer()),
+            ('classifier', SGDClassifier(loss='log_loss', random_state=42))
+        ])
+    return Pipeline([
+        ('tfidf', _build_vectorizer()),
+        ('classifier', LogisticRegression(
+            multi_class='multinomial',
+            max_iter=1000
+        ))
+    ])
+
 
 class LightweightClassifier:
-    def __init__(self):
+    # 模型文件格式版本，用于加载旧模型时的迁移
+    FORMAT_VERSION = 3
+    
+    # 增量模式下完整训练时的遍历轮数
+    INCREMENTAL_EPOCHS = 5
+    
+    def __init__(self, incremental=False, stopwords=(), n_jobs=1):
         self.categories = {
             "正向价值观": ["爱国", "敬业", "诚信", "友善", "和谐", "公平", "正义"],
             "负向价值观": ["暴力", "歧视", "谣言", "极端", "违法", "不当言论"],
             "中性": ["客观描述", "日常交流"]
         }
         
+        # 增量模式：哈希向量化 + 支持 partial_fit 的线性模型
+        self.incremental = incremental
+        
         # 构建分类pipeline
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                tokenizer=self._tokenize,
-                max_features=5000,
-                ngram_range=(1, 2)
-            )),
-            ('classifier', LogisticRegression(
-                multi_class='multinomial',
-                max_iter=1000
-            ))
-        ])
+        self.pipeline = _build_pipeline(incremental)
         
-        # 子类别分类器
+        # 子类别判别头：在主模型的特征上训练，每个主类别一列
+        self.sub_head = None
+        self.sub_head_categories = []
+        
+        # 训练数据中最大的标注ID，增量训练从这里之后继续
+        self.last_annotation_id = None
+        
+        # 旧版模型的逐子类别pipeline，仅在加载旧模型时使用
         self.sub_classifiers = {}
         
+        # 模型版本号，由 ModelRegistry 加载时设置
+        self.version = None
+        
+        # 分词器：停用词随模型保存，预测时与训练时的分词结果一致
+        self.tokenizer = Tokenizer(stopwords)
+        # 批量分词和参数搜索的进程数，训练大语料时使用
+        self.n_jobs = n_jobs
+        
+        # 最近一次训练的参数搜索结果
+        self.search_results = None
+        
+        # 编译后的推理结构（见 compiled），设置后预测不再经过 sklearn pipeline
+        self.compiled = None
+        
     def _tokenize(self, text):
-        # 使用jieba分词
-        words = jieba.cut(text)
-        # 过滤停用词
-        return [w for w in words if len(w.strip()) > 1]
+        # 使用jieba分词，过滤单字和停用词
+        return self.tokenizer.tokenize(text)
+    
+    def tokenize_many(self, texts):
+        """共享分词阶段：每条文本只分词一次，结果供主模型和所有子模型复用"""
+        # 与TfidfVectorizer默认的lowercase预处理保持一致
+        return self.tokenizer.tokenize_many([text.lower() for text in texts], self.n_jobs)
     
-    def train(self, texts, labels):
-        """训练主分类器"""
+    def train(self, texts, labels, validation_split=0.2, search=False, param_grid=None,
+              cv=DEFAULT_CV, epochs=None):
+        """训练主分类器，返回验证集准确率
+        
+        search 为 True 时先在训练集上做 k 折交叉验证的参数搜索（见 tuning，
+        param_grid 默认为 DEFAULT_PARAM_GRID），再用最优参数训练；
+        搜索结果保存在 search_results 中。
+        增量模式不做参数搜索，epochs 为完整训练时 partial_fit 遍历的轮数。
+        """
+        # 模型参数即将改变，编译结果失效
+        self.compiled = None
+        if self.incremental:
+            return self._train_incremental(texts, labels, validation_split, epochs)
+        
+        tokens = self.tokenize_many(texts)
         X_train, X_val, y_train, y_val = train_test_split(
-            texts, labels, test_size=0.2, random_state=42
+            tokens, labels, test_size=validation_split, random_state=42
         )
         
+        if search:
+            self.search_results = search_hyperparameters(
+                self.pipeline, X_train, y_train, param_grid, cv, self.n_jobs
+            )
+            if self.search_results is not None:
+                self.pipeline.set_params(**self.search_results['best_params'])
+        
         self.pipeline.fit(X_train, y_train)
         
         # 评估
         val_score = self.pipeline.score(X_val, y_val)
-        print(f"验证集准确率: {val_score:.4f}")
+        logger.info("验证集准确率: %.4f", val_score)
         
         # 训练子类别分类器
-        self._train_sub_classifiers(texts, labels)
-        
-    def _train_sub_classifiers(self, texts, labels):
-        """为每个主类别训练子类别分类器"""
-        for main_category, sub_cats in self.categories.items():
-            self.sub_classifiers[main_category] = {}
-            for sub_cat in sub_cats:
-                print(f"\n训练子分类器 - {main_category}/{sub_cat}")
-                
-                # 为每个子类别创建二元标签
-                binary_labels = [1 if label == main_category else 0 for label in labels]
-                
-                clf = Pipeline([
-                    ('tfidf', TfidfVectorizer(
-                        tokenizer=self._tokenize,
-                        max_features=5000,
-                        ngram_range=(1, 2)
-                    )),
-                    ('classifier', LogisticRegression())
-                ])
-                clf.fit(texts, binary_labels)
-                
-                self.sub_classifiers[main_category][sub_cat] = clf
+        self._train_sub_classifiers(tokens, labels)
+        
+        return val_score
+    
+    def _train_incremental(self, texts, labels, validation_split=0.2, epochs=None):
+        """增量模式下的完整训练：从头开始，多轮 partial_fit 遍历全部数据"""
+        self.pipeline.set_params(classifier=SGDClassifier(loss='log_loss', random_state=42))
+        self.sub_head = None
+        
+        texts, labels = self._filter_known_labels(texts, labels)
+        tokens = self.tokenize_many(texts)
+        features = self.pipeline[0].transform(tokens)
+        X_train, X_val, y_train, y_val = train_test_split(
+            features, np.asarray(labels), test_size=validation_split, random_state=42
+        )
+        
+        rng = np.random.RandomState(42)
+        for _ in range(epochs or self.INCREMENTAL_EPOCHS):
+            order = rng.permutation(X_train.shape[0])
+            self._partial_fit_features(X_train[order], y_train[order])
+        
+        val_score = self.pipeline[-1].score(X_val, y_val)
+        logger.info("验证集准确率: %.4f", val_score)
+        
+        # 评估后再用验证集补充一轮，使全部数据都参与训练
+        self._partial_fit_features(X_val, y_val)
+        
+        return val_score
+    
+    def partial_fit(self, texts, labels):
+        """用新增的标注数据增量更新模型，耗时只与新增数据量成正比
+        
+        返回模型在这批新数据上（更新前）的准确率，作为渐进式验证分数。
+        仅增量模式（incremental=True）的模型支持。
+        """
+        if not self.incremental:
+            raise ValueError("只有增量模式的模型支持 partial_fit，请先进行增量模式的完整训练")
+        self.compiled = None
+        
+        texts, labels = self._filter_known_labels(texts, labels)
+        if not texts:
+            return None
+        
+        tokens = self.tokenize_many(texts)
+        features = self.pipeline[0].transform(tokens)
+        labels = np.asarray(labels)
+        
+        val_score = None
+        if self.sub_head is not None:
+            val_score = self.pipeline[-1].score(features, labels)
+            logger.info("新增数据准确率（更新前）: %.4f", val_score)
+        
+        self._partial_fit_features(features, labels)
+        return val_score
+    
+    def _partial_fit_features(self, features, labels):
+        """在特征矩阵上对主模型和子类别判别头各做一次 partial_fit"""
+        main_categories = list(self.categories)
+        self.pipeline[-1].partial_fit(features, labels, classes=main_categories)
+        
+        # 以主类别为标签的一对多模型，每个主类别对应一个二元判别头
+        if self.sub_head is None:
+            self.sub_head = OneVsRestClassifier(SGDClassifier(loss='log_loss', random_state=42))
+        self.sub_head.partial_fit(features, labels, classes=main_categories)
+        # 判别头的列按 classes_（排序后的类别）排列，不是 categories 的顺序
+        self.sub_head_categories = list(self.sub_head.classes_)
+    
+    def _filter_known_labels(self, texts, labels):
+        """增量模型的类别集合固定，丢弃不在 categories 中的样本"""
+        kept = [(text, label) for text, label in zip(texts, labels) if label in self.categories]
+        if len(kept) < len(texts):
+            logger.warning("忽略 %d 条未知类别的数据", len(texts) - len(kept))
+        return [text for text, _ in kept], [label for _, label in kept]
+        
+    def _train_sub_classifiers(self, tokens, labels):
+        """在共享的TF-IDF特征上训练子类别判别头
+        
+        子类别的二元标签只取决于主类别，同一主类别下各子类别的训练数据完全相同，
+        所以每个主类别只训练一个判别头，由其下所有子类别共用。
+        """
+        logger.info("训练子类别判别头")
+        features = self.pipeline[0].transform(tokens)
+        
+        main_categories = list(self.categories)
+        binary_labels = np.array([
+            [1 if label == main_category else 0 for main_category in main_categories]
+            for label in labels
+        ])
+        
+        self.sub_head = OneVsRestClassifier(LogisticRegression())
+        self.sub_head.fit(features, binary_labels)
+        self.sub_head_categories = main_categories
+        self.sub_classifiers = {}
+    
+    def compile(self, prune=0.0):
+        """编译当前模型，之后的预测使用编译后的推理结构
+        
+        prune > 0 时剪掉绝对值小于它的权重；训练或增量更新后需要重新编译。
+        """
+        from .compiled import CompiledModel
+        self.compiled = CompiledModel.from_classifier(self, prune)
+        return self.compiled
     
     def predict(self, text):
         """预测文本的类别"""
+        return self.predict_many([text])[0]
+    
+    def predict_many(self, texts):
+        """批量预测文本的类别：整批只做一次分词、向量化和 predict_proba"""
+        if not texts:
+            return []
+        
+        # 各阶段耗时计入 classifier_stage_seconds 直方图
+        start = time.perf_counter()
+        tokens = self.tokenize_many(texts)
+        tokenized = time.perf_counter()
+        compiled = self.compiled
+        if compiled is not None:
+            # 一次稀疏乘稠密同时得到主模型和所有判别头的决策值
+            features = compiled.features(tokens)
+            vectorized = time.perf_counter()
+            decision, head_decisions = compiled.scores(features)
+            probs = compiled.predict_proba(decision)
+            classes = compiled.classes
+        else:
+            features = self.pipeline[0].transform(tokens)
+            vectorized = time.perf_counter()
+            probs = self.pipeline[-1].predict_proba(features)
+            head_decisions = None
+            classes = self.pipeline.classes_
+        
         # 主类别预测
-        probs = self.pipeline.predict_proba([text])[0]
-        pred_idx = np.argmax(probs)
-        main_category = self.pipeline.classes_[pred_idx]
-        confidence = probs[pred_idx]
+        predicted = time.perf_counter()
+        pred_idx = np.argmax(probs, axis=1)
+        main_categories = classes[pred_idx]
+        confidences = probs[np.arange(len(texts)), pred_idx]
+        # 归一化到 [0, 1] 的预测熵，用于挑选最值得人工标注的样本
+        entropies = -np.sum(probs * np.log(np.clip(probs, 1e-12, None)), axis=1)
+        if probs.shape[1] > 1:
+            entropies = entropies / np.log(probs.shape[1])
         
         # 子类别预测
-        sub_categories = self._predict_sub_categories(text, main_category)
+        sub_categories = self._predict_sub_categories(tokens, features, pred_idx, head_decisions, classes)
+        finished = time.perf_counter()
         
-        return {
-            "category": main_category,
-            "confidence": float(confidence),
-            "sub_categories": sub_categories
-        }
+        observe_stage('tokenize', tokenized - start)
+        observe_stage('vectorize', vectorized - tokenized)
+        observe_stage('main_model', predicted - vectorized)
+        observe_stage('sub_heads', finished - predicted)
+        
+        return [
+            {
+                "category": main_category,
+                "confidence": float(confidence),
+                "entropy": float(entropy),
+                "sub_categories": subs
+            }
+            for main_category, confidence, entropy, subs
+            in zip(main_categories, confidences, entropies, sub_categories)
+        ]
     
-    def _predict_sub_categories(self, text, main_category):
-        """预测子类别"""
-        sub_categories = []
+    def _predict_sub_categories(self, tokens, features, pred_idx, head_decisions=None, classes=None):
+        """批量预测子类别
         
-        if main_category in self.sub_classifiers:
-            sub_clf_dict = self.sub_classifiers[main_category]
-            for sub_cat, clf in sub_clf_dict.items():
-                try:
-                    if clf.predict([text])[0] == 1:
-                        sub_categories.append(sub_cat)
-                except Exception as e:
-                    print(f"子类别预测错误 ({sub_cat}): {str(e)}")
-                    continue
+        tokens 为 tokenize_many 的结果，features 为对应的TF-IDF特征，
+        pred_idx 为每条文本主类别在 classes（默认 pipeline.classes_）中的下标；
+        head_decisions 为编译模型已算好的判别头决策值，为 None 时由 sub_head 计算。
+        """
+        if classes is None:
+            classes = self.pipeline.classes_
+        n_samples = len(pred_idx)
+        hits = np.zeros(n_samples, dtype=bool)
+        legacy_preds = {}
         
-        # 如果没有预测出子类别，至少返回该主类别下的第一个子类别
-        if not sub_categories and main_category in self.categories:
-            sub_categories = [self.categories[main_category][0]]
+        if self.sub_head is not None:
+            # 每个主类别对应的判别头列，-1 表示没有对应的判别头
+            head_cols = np.array([
+                self.sub_head_categories.index(c) if c in self.sub_head_categories else -1
+                for c in classes
+            ])
+            row_cols = head_cols[pred_idx]
+            # 每个判别头独立判断（决策值 > 0），批量和增量两种判别头通用
+            if head_decisions is None:
+                head_decisions = self.sub_head.decision_function(features)
+            head_preds = np.asarray(head_decisions).reshape(n_samples, -1) > 0
+            hits = (row_cols >= 0) & head_preds[np.arange(n_samples), np.maximum(row_cols, 0)]
+        else:
+            # 旧版模型：每个子类别一个独立pipeline，整批各预测一次
+            for main_category in set(classes[pred_idx]):
+                for sub_cat, clf in self.sub_classifiers.get(main_category, {}).items():
+                    try:
+                        legacy_preds[(main_category, sub_cat)] = clf.predict(tokens)
+                    except Exception as e:
+                        logger.error("子类别预测错误 (%s): %s", sub_cat, e)
         
-        return sub_categories
+        results = []
+        for i, main_category in enumerate(classes[pred_idx]):
+            sub_categories = []
+            if hits[i]:
+                sub_categories = list(self.categories[main_category])
+            else:
+                for sub_cat in self.sub_classifiers.get(main_category, {}):
+                    preds = legacy_preds.get((main_category, sub_cat))
+                    if preds is not None and preds[i] == 1:
+                        sub_categories.append(sub_cat)
+            
+            # 如果没有预测出子类别，至少返回该主类别下的第一个子类别
+            if not sub_categories and main_category in self.categories:
+                sub_categories = [self.categories[main_category][0]]
+            
+            results.append(sub_categories)
+        
+        return results
     
     def _get_keywords(self, category):
         """获取类别相关的关键词"""
@@ -123,16 +380,67 @@ class LightweightClassifier:
         return keywords.get(category, [category])
     
     def save(self, path):
-        """保存模型"""
+        """保存模型
+        
+        以 .pkl 结尾时保存为旧版 pickle 文件，否则保存为可内存映射的模型目录
+        （见 model_artifact）。
+        """
+        if not path.endswith('.pkl'):
+            save_artifact(self, path)
+            return
         with open(path, 'wb') as f:
             pickle.dump({
+                'format_version': self.FORMAT_VERSION,
+                'incremental': self.incremental,
+                'last_annotation_id': self.last_annotation_id,
                 'pipeline': self.pipeline,
-                'sub_classifiers': self.sub_classifiers
+                'sub_head': self.sub_head,
+                'sub_head_categories': self.sub_head_categories,
+                'sub_classifiers': self.sub_classifiers,
+                'stopwords': sorted(self.tokenizer.stopwords)
             }, f)
     
-    def load(self, path):
-        """加载模型"""
-        with open(path, 'rb') as f:
-            data = pickle.load(f)
-            self.pipeline = data['pipeline']
-            self.sub_classifiers = data['sub_classifiers'] 
\ No newline at end of file
+    def load(self, path, allow_pickle=True):
+        """加载模型
+        
+        模型目录直接映射 .npy 数组，不经过 pickle；旧版 .pkl 文件只应来自可信来源，
+        allow_pickle=False 时拒绝加载。
+        """
+        if os.path.isdir(path):
+            if not is_artifact(path):
+                raise FileNotFoundError(f"模型目录缺少 manifest: {path}")
+            data = load_artifact(path, _build_pipeline)
+        elif not allow_pickle:
+            raise ValueError(f"拒绝加载 pickle 格式的模型文件: {path}")
+        else:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        
+        self.incremental = data.get('incremental', False)
+        self.compiled = None
+        self.last_annotation_id = data.get('last_annotation_id')
+        self.pipeline = data['pipeline']
+        self.sub_head = data.get('sub_head')
+        self.sub_head_categories = data.get('sub_head_categories', [])
+        self.sub_classifiers = data['sub_classifiers']
+        self.tokenizer = Tokenizer(data.get('stopwords', ()))
+        
+        if data.get('format_version', 1) < 2:
+            self._migrate_vectorizers()
+    
+    def _migrate_vectorizers(self):
+        """迁移旧版模型：旧版向量化器自带jieba分词，改为接收共享的词列表
+        
+        已拟合的词表和IDF不变，只替换分词/预处理参数，预测结果与旧版一致。
+        """
+        pipelines = [self.pipeline]
+        for sub_clf_dict in self.sub_classifiers.values():
+            pipelines.extend(sub_clf_dict.values())
+        
+        for pipeline in pipelines:
+            pipeline.named_steps['tfidf'].set_params(
+                tokenizer=_identity,
+                preprocessor=_identity,
+                token_pattern=None,
+                lowercase=False
+            )
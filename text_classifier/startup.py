@@ -0,0 +1,94 @@
+"""服务启动：预加载 jieba 词典、加载模型并预热，记录各阶段耗时
+
+测量各依赖和 api 模块的导入耗时：python -m text_classifier.startup
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# jieba 前缀词典的缓存文件，首次启动时生成，之后直接加载
+JIEBA_CACHE = os.environ.get('CLASSIFIER_JIEBA_CACHE', 'models/jieba.cache')
+# 预热用的文本，覆盖分词、向量化和两个模型
+WARMUP_TEXT = '我们要热爱祖国，认真工作'
+
+# 导入耗时测量的模块，依赖在前
+IMPORT_MODULES = [
+    'numpy', 'pandas', 'sklearn.linear_model', 'jieba', 'openai',
+    'text_classifier.models', 'text_classifier.api'
+]
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """启动状态和各阶段耗时，供 /ready 接口返回"""
+
+    def __init__(self):
+        self.status = 'starting'  # starting / ready / stopping
+        self.timings = {}
+
+    @property
+    def ready(self):
+        return self.status == 'ready'
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+            logger.info("启动阶段 %s: %.3f 秒", name, self.timings[name])
+
+    def to_dict(self):
+        return {"status": self.status, "timings": dict(self.timings)}
+
+
+def preload_jieba(cache_file=JIEBA_CACHE):
+    """加载 jieba 词典；指定缓存文件后只在词典变化时重新构建前缀词典"""
+    import jieba
+
+    cache_dir = os.path.dirname(os.path.abspath(cache_file))
+    os.makedirs(cache_dir, exist_ok=True)
+    jieba.dt.cache_file = os.path.abspath(cache_file)
+    jieba.initialize()
+
+
+def warm_up(classifier):
+    """用一条文本跑通完整的预测路径，首个请求不再承担懒加载开销"""
+    if classifier.version is None:
+        # 没有训练好的模型，无需预热
+        return None
+    return classifier.predict(WARMUP_TEXT)
+
+
+def measure_import_times(modules=IMPORT_MODULES):
+    """在独立的解释器中逐个测量模块导入耗时（秒），避免互相共享已导入的依赖"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "__import__(sys.argv[1])\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    timings = {}
+    for module in modules:
+        result = subprocess.run(
+            [sys.executable, '-c', code, module],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            timings[module] = None
+            continue
+        timings[module] = float(result.stdout.strip().splitlines()[-1])
+    return timings
+
+
+if __name__ == '__main__':
+    for module, seconds in measure_import_times().items():
+        if seconds is None:
+            print(f"{module:<28} 导入失败")
+        else:
+            print(f"{module:<28} {seconds * 1000:8.1f} ms")
@@ -152,6 +152,33 @@ function clearAnnotationForm() {
         .forEach(checkbox => checkbox.checked = false);
 }
 
+// 主动学习待标注队列：一次取一批，逐条填入标注框
+let annotationQueue = [];
+
+async function loadNextQueuedText() {
+    try {
+        if (!annotationQueue.length) {
+            const response = await fetch('/annotation-queue?limit=20');
+            const data = await response.json();
+            annotationQueue = data.items || [];
+        }
+        const item = annotationQueue.shift();
+        if (!item) {
+            showNotification('暂无待标注文本', 'info');
+            return;
+        }
+        clearAnnotationForm();
+        document.getElementById('annotate-text').value = item.text;
+        showNotification(
+            `模型预测: ${item.main_category}（置信度 ${(item.confidence * 100).toFixed(1)}%）`,
+            'info'
+        );
+    } catch (error) {
+        console.error('Error:', error);
+        showNotification('获取待标注文本失败', 'error');
+    }
+}
+
 // 修改提交标注函数
 async function submitAnnotation() {
     const text = document.getElementById('annotate-text').value;
@@ -185,6 +212,9 @@ async function submitAnnotation() {
             // 先重新加载标注数据
             await loadAnnotations();
             
+            // 已标注的文本不再从本地队列中出现
+            annotationQueue = annotationQueue.filter(item => item.text !== text);
+            
             // 再清空表单
             clearAnnotationForm();
             
@@ -264,7 +294,7 @@ async function retrainModel() {
         messageEl.textContent = '正在准备训练数据...';
         
         // 获取训练数据统计
-        const statsResponse = await fetch('/training-data');
+        const statsResponse = await fetch('/training-data?limit=0');
         const statsData = await statsResponse.json();
         dataCountEl.textContent = statsData.stats.total;
         
@@ -289,14 +319,22 @@ async function retrainModel() {
             throw new Error('服务器响应错误');
         }
         
-        const result = await response.json();
+        const submitted = await response.json();
+        
+        // 轮询训练任务状态
+        const job = await waitForRetrainJob(submitted.job_id, (job) => {
+            messageEl.textContent = `${job.stage} (${Math.round(job.progress * 100)}%)`;
+            timeEl.textContent = ((Date.now() - startTime) / 1000).toFixed(1);
+        });
         
         // 更新训练状态
         const trainingTime = ((Date.now() - startTime) / 1000).toFixed(1);
         timeEl.textContent = trainingTime;
-        messageEl.textContent = '训练完成！';
+        messageEl.textContent = job.val_score !== null
+            ? `训练完成！验证集准确率: ${(job.val_score * 100).toFixed(2)}%`
+            : '训练完成！';
         
-        showNotification(result.message || '模型重训练完成', 'success');
+        showNotification('模型重训练完成', 'success');
         
         // 3秒后隐藏状态框
         setTimeout(() => {
@@ -315,6 +353,27 @@ async function retrainModel() {
     }
 }
 
+// 轮询重训练任务直到结束，onProgress 在每次查询后调用
+async function waitForRetrainJob(jobId, onProgress) {
+    while (true) {
+        const response = await fetch(`/retrain/${jobId}`);
+        if (!response.ok) {
+            throw new Error('查询训练任务失败');
+        }
+        const job = await response.json();
+        if (onProgress) {
+            onProgress(job);
+        }
+        if (job.status === 'succeeded') {
+            return job;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || '训练失败');
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+}
+
 function showLoading(show) {
     const loader = document.querySelector('.loader');
     if (show) {
@@ -4,6 +4,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from .models import LightweightClassifier
 from .data_processor import DataProcessor
+from .log import configure_logging
 import argparse
 
 class Dataset:
@@ -49,25 +50,37 @@ def train_model():
     # 解析命令行参数
     parser = argparse.ArgumentParser()
     parser.add_argument('--data_path', type=str, required=True)
-    parser.add_argument('--model_path', type=str, default='models/classifier.pkl')
+    parser.add_argument('--model_path', type=str, default='models/classifier')
+    parser.add_argument('--n_jobs', type=int, default=os.cpu_count() or 1,
+                        help='并行分词和参数搜索的进程数')
+    parser.add_argument('--validation_split', type=float, default=0.2)
+    parser.add_argument('--search', action='store_true',
+                        help='用 k 折交叉验证搜索向量化器和正则化参数')
+    parser.add_argument('--cv', type=int, default=5, help='交叉验证折数')
     args = parser.parse_args()
+    configure_logging()
     
     # 初始化
     processor = DataProcessor()
-    classifier = LightweightClassifier()
+    classifier = LightweightClassifier(stopwords=processor.stopwords, n_jobs=args.n_jobs)
     
     # 加载数据
     texts, labels = processor.load_data(args.data_path)
     
     # 预处理
-    texts = [processor.preprocess_text(text) for text in texts]
+    texts = processor.preprocess_many(texts)
     
     # 数据增强
     texts, labels = processor.augment_data(texts, labels)
     
     # 训练模型
     print("开始训练模型...")
-    classifier.train(texts, labels)
+    classifier.train(
+        texts, labels,
+        validation_split=args.validation_split,
+        search=args.search,
+        cv=args.cv
+    )
     
     # 保存模型
     classifier.save(args.model_path)
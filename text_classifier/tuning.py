@@ -0,0 +1,71 @@
+"""超参数搜索：在已分好词的训练集上做 k 折交叉验证的网格搜索
+
+分词只做一次；pipeline 通过 joblib.Memory 缓存每一折上拟合好的向量化器，
+只有分类器参数不同的候选直接复用同一折的特征矩阵，不重复向量化。
+候选参数和折按 n_jobs 个进程并行评估。
+"""
+import logging
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from joblib import Memory
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+# 默认搜索空间：向量化器的词表大小、n-gram 范围、TF 缩放和逻辑回归的正则强度
+DEFAULT_PARAM_GRID = {
+    'tfidf__max_features': [2000, 5000, 20000],
+    'tfidf__ngram_range': [(1, 1), (1, 2)],
+    'tfidf__sublinear_tf': [False, True],
+    'classifier__C': [0.3, 1.0, 3.0, 10.0],
+}
+
+# 交叉验证默认折数
+DEFAULT_CV = 5
+
+logger = logging.getLogger(__name__)
+
+
+def search_hyperparameters(pipeline, tokens, labels, param_grid=None, cv=DEFAULT_CV, n_jobs=1):
+    """在 (tokens, labels) 上搜索 pipeline 的最优参数
+
+    返回 best_params、best_score（交叉验证平均准确率）、候选数、实际折数和耗时；
+    样本太少无法做交叉验证时返回 None。
+    """
+    param_grid = param_grid or DEFAULT_PARAM_GRID
+    # 每一折每个类别至少要有一条数据
+    folds = min(cv, min(Counter(labels).values()))
+    if folds < 2:
+        logger.warning("训练数据太少，跳过参数搜索")
+        return None
+
+    cache_dir = tempfile.mkdtemp(prefix='classifier-search-')
+    try:
+        search = GridSearchCV(
+            clone(pipeline).set_params(memory=Memory(cache_dir, verbose=0)),
+            param_grid,
+            cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=42),
+            scoring='accuracy',
+            n_jobs=n_jobs,
+            refit=False
+        )
+        start = time.perf_counter()
+        search.fit(tokens, labels)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results = {
+        "best_params": search.best_params_,
+        "best_score": float(search.best_score_),
+        "candidates": len(search.cv_results_['params']),
+        "folds": folds,
+        "seconds": elapsed
+    }
+    logger.info(
+        "参数搜索完成: %d 组参数 x %d 折，耗时 %.1f 秒，最优交叉验证准确率 %.4f，最优参数 %s",
+        results['candidates'], folds, elapsed, results['best_score'], results['best_params']
+    )
+    return results
@@ -0,0 +1,51 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WorkerBusyError(Exception):
+    """排队的任务数超过上限"""
+    pass
+
+
+class WorkerPool:
+    """有界线程池：把CPU密集或阻塞的任务移出事件循环
+
+    同时在执行和排队的任务数超过 max_workers + max_queue 时直接拒绝，
+    由调用方转换为 503，避免请求无限堆积拖垮延迟。
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=name
+        )
+        # 只在事件循环线程中修改，无需加锁
+        self._pending = 0
+
+    @property
+    def pending(self):
+        """正在执行和排队中的任务数"""
+        return self._pending
+
+    @property
+    def queue_depth(self):
+        """排队等待执行的任务数"""
+        return max(0, self._pending - self.max_workers)
+
+    async def run(self, func, *args):
+        """在线程池中执行 func(*args) 并等待结果"""
+        if self._pending >= self.max_workers + self.max_queue:
+            raise WorkerBusyError(f"{self.name} 队列已满")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)